@@ -0,0 +1,206 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+from results import DEFAULT_CAMPAIGN, RESULTS_LOG, ResultsLog
+
+# Analyse des campagnes du journal out/results.jsonl : intervalles de confiance bootstrap
+# par palier, comparaison à une campagne de référence et détection de régressions.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'out')
+
+# Sens d'une régression pour chaque métrique
+METRICS = {
+    'AVG_MS': 'higher',
+    'P50_MS': 'higher',
+    'P99_MS': 'higher',
+    'RPS': 'lower',
+    'FAIL_RATIO': 'higher',
+}
+DEFAULT_METRICS = ['AVG_MS', 'P99_MS', 'RPS']
+# Référence nulle (FAIL_RATIO sans erreurs) : pas de variation relative, écart absolu comparé à ce seuil
+ABS_THRESHOLD = 0.01
+
+BOOTSTRAP_SAMPLES = 10000
+# Au-delà, le test de permutation est échantillonné au lieu d'être exact
+EXACT_PERMUTATIONS = 20000
+
+def parse_args():
+    p = argparse.ArgumentParser(description="IC bootstrap par palier et détection de régressions entre campagnes")
+    p.add_argument('sweep', nargs='?', help="Nom du sweep (conc, fanout, post...)")
+    p.add_argument('--campaign', default=DEFAULT_CAMPAIGN, help="Campagne analysée (candidate)")
+    p.add_argument('--baseline', default=None, help="Campagne de référence à comparer")
+    p.add_argument('--metrics', nargs='+', default=DEFAULT_METRICS, choices=sorted(METRICS))
+    p.add_argument('--threshold', type=float, default=0.1, help="Dégradation relative tolérée (0.1 = 10%%)")
+    p.add_argument('--abs-threshold', type=float, default=ABS_THRESHOLD,
+                   help="Dégradation absolue tolérée quand la référence vaut 0 (ex. FAIL_RATIO 0 -> 0.01)")
+    p.add_argument('--alpha', type=float, default=0.05, help="Seuil de significativité du test")
+    p.add_argument('--confidence', type=float, default=0.95)
+    p.add_argument('--seed', type=int, default=None, help="Graine du bootstrap (résultats reproductibles)")
+    p.add_argument('--log', default=RESULTS_LOG)
+    p.add_argument('--list', action='store_true', help="Liste les campagnes du journal")
+    return p.parse_args()
+
+def step_values(entries, metric):
+    # {paramètre: [valeur de chaque run]} dans l'ordre d'apparition des paliers
+    steps = {}
+    for entry in sorted(entries, key=lambda e: e['run']):
+        value = entry['row'].get(metric)
+        if value is None or value == '':
+            continue
+        steps.setdefault(json.dumps(entry['param']), []).append(float(value))
+    return steps
+
+def bootstrap_ci(values, confidence=0.95, samples=BOOTSTRAP_SAMPLES, rng=None):
+    rng = rng or np.random.default_rng()
+    values = np.asarray(values, dtype=float)
+    if values.size < 2:
+        return float(values.mean()), float(values.mean())
+    means = rng.choice(values, size=(samples, values.size)).mean(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    lo, hi = np.percentile(means, [tail, 100 - tail])
+    return float(lo), float(hi)
+
+def permutation_pvalue(baseline, candidate, direction, samples=EXACT_PERMUTATIONS, rng=None):
+    # Test unilatéral sur la différence des moyennes (candidate - baseline) dans le sens de la régression
+    pooled = np.concatenate([baseline, candidate]).astype(float)
+    n, k = pooled.size, len(candidate)
+    sign = 1 if direction == 'higher' else -1
+    observed = sign * (np.mean(candidate) - np.mean(baseline))
+    total = pooled.sum()
+
+    if math.comb(n, k) <= samples:
+        picks = np.array(list(itertools.combinations(range(n), k)), dtype=int)
+    else:
+        rng = rng or np.random.default_rng()
+        picks = np.argsort(rng.random((samples, n)), axis=1)[:, :k]
+    cand_sum = pooled[picks].sum(axis=1)
+    diffs = sign * (cand_sum / k - (total - cand_sum) / (n - k))
+    return float(np.mean(diffs >= observed - 1e-12))
+
+def summarize(entries, metrics, confidence=0.95, rng=None):
+    rows = []
+    for metric in metrics:
+        for param, values in step_values(entries, metric).items():
+            lo, hi = bootstrap_ci(values, confidence, rng=rng)
+            rows.append({
+                'PARAM': json.loads(param),
+                'METRIC': metric,
+                'RUNS': len(values),
+                'MEAN': round(float(np.mean(values)), 3),
+                'CI_LOW': round(lo, 3),
+                'CI_HIGH': round(hi, 3),
+            })
+    return rows
+
+def compare(baseline, candidate, metrics, threshold=0.1, alpha=0.05, confidence=0.95, rng=None,
+            abs_threshold=ABS_THRESHOLD):
+    rows = []
+    for metric in metrics:
+        direction = METRICS[metric]
+        base_steps = step_values(baseline, metric)
+        for param, values in step_values(candidate, metric).items():
+            base = base_steps.get(param)
+            if not base:
+                continue
+            base_mean, cand_mean = float(np.mean(base)), float(np.mean(values))
+            if base_mean:
+                change, limit = (cand_mean - base_mean) / base_mean, threshold
+            else:
+                change, limit = cand_mean - base_mean, abs_threshold
+            worse = change > limit if direction == 'higher' else change < -limit
+            p = permutation_pvalue(base, values, direction, rng=rng)
+            lo, hi = bootstrap_ci(values, confidence, rng=rng)
+            rows.append({
+                'PARAM': json.loads(param),
+                'METRIC': metric,
+                'BASELINE': round(base_mean, 3),
+                'CANDIDATE': round(cand_mean, 3),
+                'CI_LOW': round(lo, 3),
+                'CI_HIGH': round(hi, 3),
+                'CHANGE': round(change, 4),
+                # CHANGE absolu (et non relatif) quand la référence vaut 0
+                'ABSOLUTE': int(not base_mean),
+                'P_VALUE': round(p, 4),
+                'REGRESSION': int(worse and p <= alpha),
+            })
+    return rows
+
+def write_rows(rows, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['PARAM'])
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def print_summary(rows, confidence):
+    for row in rows:
+        print(f"  {row['METRIC']:<10} {row['PARAM']!s:>8} : {row['MEAN']:>10} "
+              f"[{row['CI_LOW']}, {row['CI_HIGH']}] (IC {confidence:.0%}, {row['RUNS']} runs)")
+
+def change(row):
+    return f"{row['CHANGE']:+g} abs" if row['ABSOLUTE'] else f"{row['CHANGE']:+.1%}"
+
+def print_comparison(rows):
+    for row in rows:
+        flag = "REGRESSION" if row['REGRESSION'] else "ok"
+        print(f"  {row['METRIC']:<10} {row['PARAM']!s:>8} : {row['BASELINE']:>10} -> {row['CANDIDATE']:<10} "
+              f"({change(row)}, p={row['P_VALUE']}) {flag}")
+
+def main():
+    args = parse_args()
+    log = ResultsLog(args.log)
+    rng = np.random.default_rng(args.seed)
+
+    if args.list or not args.sweep:
+        for sweep in sorted({e['sweep'] for e in log.entries}):
+            if args.sweep in (None, sweep):
+                print(f"{sweep}: {', '.join(log.campaigns(sweep))}")
+        return 0
+
+    candidate = log.select(args.campaign, args.sweep)
+    if not candidate:
+        print(f"Aucun résultat pour '{args.sweep}' dans la campagne '{args.campaign}'.")
+        return 2
+
+    print(f"--- [ANALYSE] {args.sweep} / campagne '{args.campaign}' ---")
+    summary = summarize(candidate, args.metrics, args.confidence, rng)
+    print_summary(summary, args.confidence)
+    path = write_rows(summary, os.path.join(OUT_DIR, 'analysis', f"{args.sweep}_{args.campaign}.csv"))
+    print(f"Résumé dans : {path}")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = log.select(args.baseline, args.sweep)
+    if not baseline:
+        print(f"Aucun résultat pour '{args.sweep}' dans la campagne de référence '{args.baseline}'.")
+        return 2
+
+    print(f"\n--- [COMPARAISON] '{args.baseline}' -> '{args.campaign}' "
+          f"(seuil {args.threshold:.0%}, alpha {args.alpha}) ---")
+    rows = compare(baseline, candidate, args.metrics, args.threshold, args.alpha, args.confidence, rng,
+                   args.abs_threshold)
+    if not rows:
+        print("Aucun palier commun aux deux campagnes.")
+        return 2
+    print_comparison(rows)
+    path = write_rows(rows, os.path.join(OUT_DIR, 'analysis', f"{args.sweep}_{args.baseline}_vs_{args.campaign}.csv"))
+    print(f"Comparaison dans : {path}")
+
+    regressions = [r for r in rows if r['REGRESSION']]
+    if regressions:
+        print(f"\n[ANALYSE] {len(regressions)} régression(s) significative(s) détectée(s).")
+        return 1
+    print("\n[ANALYSE] Pas de régression significative.")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,40 @@
+import os
+
+# Backends de stockage : Datastore GCP, émulateur Datastore, ou stand-in local (sqlite).
+# Le choix passe par --backend ou la variable BENCH_BACKEND (héritée par les sous-process).
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+BACKENDS = ['datastore', 'emulator', 'local']
+DEFAULT_BACKEND = os.environ.get('BENCH_BACKEND', 'datastore')
+LOCAL_DB = os.environ.get('BENCH_LOCAL_DB', os.path.join(PROJECT_ROOT, 'out', 'local.db'))
+# Manifeste du dernier dataset seedé (lu par le locustfile)
+DATASET_FILE = os.environ.get('BENCH_DATASET', os.path.join(PROJECT_ROOT, 'out', 'dataset.json'))
+EMULATOR_HOST = 'localhost:8081'
+EMULATOR_PROJECT = 'bench-local'
+
+def add_backend_args(parser):
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Stockage cible (défaut: $BENCH_BACKEND ou datastore)")
+
+def get_client(name=None):
+    name = name or DEFAULT_BACKEND
+    if name == 'local':
+        from localstore import LocalClient
+        os.makedirs(os.path.dirname(LOCAL_DB), exist_ok=True)
+        return LocalClient(LOCAL_DB)
+
+    from google.cloud import datastore
+    if name == 'emulator':
+        os.environ.setdefault('DATASTORE_EMULATOR_HOST', EMULATOR_HOST)
+        return datastore.Client(project=os.environ.get('DATASTORE_PROJECT_ID', EMULATOR_PROJECT))
+    return datastore.Client()
+
+def new_entity(key, exclude_from_indexes=()):
+    import localstore
+    if isinstance(key, localstore.Key):
+        return localstore.Entity(key, exclude_from_indexes)
+
+    from google.cloud import datastore
+    return datastore.Entity(key, exclude_from_indexes=exclude_from_indexes)
@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Écriture en masse : plusieurs batchs en vol, backpressure, retry avec backoff.
+
+class RateLimiter:
+    # Débit cible (éléments/s) : wait(n) dort tant que l'on est en avance sur le rythme ; rate=0 -> illimité
+    def __init__(self, rate=0):
+        self.rate = rate
+        self.sent = 0
+        self._start = time.perf_counter()
+
+    def wait(self, n):
+        self.sent += n
+        if not self.rate:
+            return
+        ahead = self.sent / self.rate - (time.perf_counter() - self._start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+class BulkWriter:
+    def __init__(self, op, batch_size=400, workers=8, max_in_flight=None,
+                 max_retries=5, base_delay=0.25, max_delay=8.0, label="put", dry=False):
+        self.op = op
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.label = label
+        self.dry = dry
+
+        # Backpressure : add() bloque tant que max_in_flight batchs sont en cours
+        self._slots = threading.BoundedSemaphore(max_in_flight or workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        # Jitter indépendant du random global (qui peut être seedé)
+        self._jitter = random.Random()
+        self._batch = []
+
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.errors = []
+        self._start = time.perf_counter()
+        self._elapsed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def add(self, item):
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def flush(self):
+        if self._batch:
+            self._submit()
+
+    def close(self):
+        if self._elapsed is not None:
+            return self.stats()
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self._elapsed = time.perf_counter() - self._start
+        return self.stats()
+
+    def _submit(self):
+        batch, self._batch = self._batch, []
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, batch)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if not self.dry:
+                    self.op(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.failed += len(batch)
+                        self.errors.append(repr(e))
+                    print("x", end="", flush=True)
+                    return
+                with self._lock:
+                    self.retries += 1
+                # Full jitter : uniforme entre 0 et le plafond exponentiel
+                cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(self._jitter.uniform(0, cap))
+                continue
+
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+            print(".", end="", flush=True)
+            return
+
+    def elapsed(self):
+        if self._elapsed is not None:
+            return self._elapsed
+        return time.perf_counter() - self._start
+
+    def stats(self):
+        elapsed = self.elapsed()
+        return {
+            'label': self.label,
+            'written': self.written,
+            'failed': self.failed,
+            'retries': self.retries,
+            'batches': self.batches,
+            'elapsed': elapsed,
+            'rate': self.written / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"\n[{s['label']}] {s['written']} entités en {s['elapsed']:.1f}s "
+              f"({s['rate']:.0f} entités/s, {s['batches']} batchs, "
+              f"{s['retries']} retries, {s['failed']} échecs)")
+        for err in self.errors[:3]:
+            print(f"  Erreur: {err}")
+        return s
@@ -0,0 +1,320 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from backend import DATASET_FILE, add_backend_args, get_client
+from graph import generate_follows
+from histogram import Histogram
+from locustfile import PROFILES
+from seed import rngs
+
+# Simulation d'un cache de timelines devant /api/timeline : le flux de requêtes du locustfile
+# (profil, Zipf sur les users) est rejoué hors ligne à travers des caches LRU / LFU / TTL,
+# avec ou sans invalidation des timelines des followers à chaque post (graphe du seed).
+# Sortie : taux de hit, latence effective et fraîcheur par taille de cache et biais des users.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'out')
+OUTPUT = os.path.join(OUT_DIR, 'cache.csv')
+
+POLICIES = ['lru', 'lfu', 'ttl']
+FIELDS = ['POLICY', 'INVALIDATION', 'SIZE', 'SIZE_RATIO', 'ZIPF', 'READS', 'HIT_RATIO', 'EFFECTIVE_MS',
+          'EFFECTIVE_P99_MS', 'STALE_RATIO', 'STALENESS_MEAN_S', 'STALENESS_MAX_S', 'INVALIDATIONS_PER_POST',
+          'EVICTIONS']
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Simulation d'un cache de timelines (LRU/LFU/TTL, invalidation)")
+    p.add_argument('--profile', default='read-heavy', choices=sorted(PROFILES), help="Mélange de requêtes rejoué")
+    p.add_argument('--requests', type=int, default=100000, help="Requêtes simulées par configuration")
+    p.add_argument('--rps', type=float, default=200, help="Débit simulé (horloge des TTL et de la fraîcheur)")
+    p.add_argument('--policies', nargs='+', default=POLICIES, choices=POLICIES)
+    p.add_argument('--invalidation', nargs='+', default=['off', 'on'], choices=['off', 'on'],
+                   help="Invalidation des timelines des followers à chaque post / follow")
+    p.add_argument('--sizes', nargs='+', type=float, default=[0.01, 0.05, 0.1, 0.25, 0.5],
+                   help="Tailles de cache : fraction des users si < 1, sinon nombre d'entrées")
+    p.add_argument('--skews', nargs='+', type=float, default=None,
+                   help="Exposants Zipf des users lus (défaut: celui du profil)")
+    p.add_argument('--ttl', type=float, default=30, help="Durée de vie des entrées (s) pour la politique ttl")
+    p.add_argument('--hit-ms', type=float, default=1.0, help="Latence d'un hit")
+    p.add_argument('--miss-ms', type=float, default=150.0, help="Latence d'un miss (si --miss-hist absent)")
+    p.add_argument('--miss-hist', default=None, help="Histogramme mesuré (out/hist/...) pour tirer les miss")
+    p.add_argument('--target-hit', type=float, default=0.9, help="Taux de hit visé pour le dimensionnement")
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--dataset-file', default=DATASET_FILE)
+    add_backend_args(p)
+    return p.parse_args()
+
+def load_graph(manifest, backend=None):
+    # Graphe CSR indexé par rang (user{i+1} -> i) : regénéré depuis le manifeste si le seed
+    # était déterministe, lu dans la base sinon
+    n = manifest['users']
+    if manifest.get('seed') is not None and manifest.get('fingerprint'):
+        graph_rng, _ = rngs(manifest['seed'])
+        return generate_follows(n, manifest['follows_min'], manifest['follows_max'],
+                                manifest.get('graph_dist', 'uniform'), manifest.get('graph_alpha', 1.0),
+                                manifest.get('graph_celebrities', 0), manifest.get('graph_celebrity_reach', 0.5),
+                                rng=graph_rng)
+
+    prefix = manifest.get('prefix', 'user')
+    client = get_client(backend)
+    rows = [[] for _ in range(n)]
+    for entity in client.query(kind='User').fetch():
+        i = rank(entity.key.name, prefix)
+        if i is not None and i < n:
+            rows[i] = [j for j in (rank(f, prefix) for f in entity.get('follows') or []) if j is not None and j < n]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=offsets[1:])
+    return offsets, np.array([j for r in rows for j in r], dtype=np.int64)
+
+def rank(name, prefix):
+    suffix = name[len(prefix):] if name.startswith(prefix) else ''
+    return int(suffix) - 1 if suffix.isdigit() else None
+
+def followers_of(offsets, targets, n):
+    # CSR inverse : followers de chaque user
+    sources = np.repeat(np.arange(n), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    rev_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n), out=rev_offsets[1:])
+    return rev_offsets, sources[order]
+
+class Stream:
+    # Flux de requêtes tiré une fois par biais Zipf, rejoué à l'identique pour chaque cache
+    def __init__(self, profile, n, zipf, requests, hot, rng):
+        weights = np.array([profile['timeline'], profile['post'], profile['follow']], dtype=float)
+        self.ops = rng.choice(3, size=requests, p=weights / weights.sum())
+        if zipf:
+            p = np.arange(1, n + 1, dtype=float) ** -zipf
+            self.users = rng.choice(n, size=requests, p=p / p.sum())
+            self.targets = rng.choice(n, size=requests, p=p / p.sum())
+        else:
+            self.users = rng.integers(0, n, size=requests)
+            self.targets = rng.integers(0, n, size=requests)
+        if profile['celebrity_posts'] and len(hot):
+            posts = self.ops == 1
+            self.users[posts] = rng.choice(hot, size=int(posts.sum()))
+
+class LRUCache:
+    def __init__(self, capacity, ttl=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and now - entry[0] > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, now):
+        self.entries[key] = [now, None]
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, key):
+        return self.entries.get(key)
+
+    def pop(self, key):
+        return self.entries.pop(key, None)
+
+class LFUCache:
+    # LFU avec tas paresseux (fréquence, âge) ; les entrées périmées du tas sont ignorées
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = {}
+        self.freq = defaultdict(int)
+        self.heap = []
+        self.tick = 0
+        self.evictions = 0
+
+    def _touch(self, key):
+        self.freq[key] += 1
+        self.tick += 1
+        heapq.heappush(self.heap, (self.freq[key], self.tick, key))
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._touch(key)
+        return entry
+
+    def put(self, key, now):
+        self.entries[key] = [now, None]
+        self._touch(key)
+        while len(self.entries) > self.capacity:
+            freq, _, victim = heapq.heappop(self.heap)
+            if victim in self.entries and freq == self.freq[victim]:
+                del self.entries[victim]
+                self.evictions += 1
+        if len(self.heap) > 4 * self.capacity + 1024:
+            self.heap = [(self.freq[k], i, k) for i, k in enumerate(self.entries)]
+            heapq.heapify(self.heap)
+
+    def peek(self, key):
+        return self.entries.get(key)
+
+    def pop(self, key):
+        return self.entries.pop(key, None)
+
+def make_cache(policy, capacity, ttl):
+    if policy == 'lru':
+        return LRUCache(capacity)
+    if policy == 'lfu':
+        return LFUCache(capacity)
+    return LRUCache(capacity, ttl)
+
+def simulate(stream, cache, followers, invalidate, rps):
+    # Entrée du cache : [date de mise en cache, date à partir de laquelle elle est périmée]
+    rev_offsets, rev = followers
+    hits = reads = stale_hits = posts = invalidations = 0
+    staleness = []
+    hit_mask = np.zeros(len(stream.ops), dtype=bool)
+
+    for i, (op, user, target) in enumerate(zip(stream.ops.tolist(), stream.users.tolist(), stream.targets.tolist())):
+        now = i / rps
+        if op == 0:
+            reads += 1
+            entry = cache.get(user, now)
+            if entry is None:
+                cache.put(user, now)
+                continue
+            hits += 1
+            hit_mask[i] = True
+            if entry[1] is not None:
+                stale_hits += 1
+                staleness.append(now - entry[1])
+            continue
+
+        # Post : la timeline de chaque follower change. Follow : celle du follower.
+        if op == 1:
+            posts += 1
+            affected = rev[rev_offsets[user]:rev_offsets[user + 1]].tolist()
+        else:
+            affected = [user] if target != user else []
+        for follower in affected:
+            if invalidate:
+                if cache.pop(follower) is not None:
+                    invalidations += 1
+                continue
+            entry = cache.peek(follower)
+            if entry is not None and entry[1] is None:
+                entry[1] = now
+
+    return {
+        'reads': reads,
+        'hit_ratio': hits / reads if reads else 0.0,
+        'stale_ratio': stale_hits / reads if reads else 0.0,
+        'staleness_mean': float(np.mean(staleness)) if staleness else 0.0,
+        'staleness_max': float(np.max(staleness)) if staleness else 0.0,
+        'invalidations_per_post': invalidations / posts if posts else 0.0,
+        'evictions': cache.evictions,
+        'hit_mask': hit_mask[stream.ops == 0],
+    }
+
+def miss_sampler(args, rng):
+    if not args.miss_hist:
+        return lambda size: np.full(size, args.miss_ms)
+    histogram = Histogram.load(args.miss_hist)
+    values = np.array(sorted(histogram.counts), dtype=float)
+    weights = np.array([histogram.counts[int(v)] for v in values], dtype=float)
+    return lambda size: rng.choice(values, size=size, p=weights / weights.sum())
+
+def effective_latency(hit_mask, hit_ms, sample_miss):
+    latencies = np.where(hit_mask, hit_ms, sample_miss(hit_mask.size))
+    if not latencies.size:
+        return 0.0, 0.0
+    return float(latencies.mean()), float(np.percentile(latencies, 99))
+
+def capacity(size, n):
+    return max(1, int(round(size * n))) if size < 1 else int(size)
+
+def sizing(rows, target):
+    # Plus petit cache qui atteint le taux de hit visé, par politique / invalidation / biais
+    best = {}
+    for row in rows:
+        key = (row['POLICY'], row['INVALIDATION'], row['ZIPF'])
+        if row['HIT_RATIO'] >= target and (key not in best or row['SIZE'] < best[key]['SIZE']):
+            best[key] = row
+    return best
+
+def main():
+    args = parse_args()
+    try:
+        with open(args.dataset_file) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        print(f"[Cache] Manifeste {args.dataset_file} introuvable : lancer seed.py d'abord.")
+        return 1
+
+    n = manifest['users']
+    offsets, targets = load_graph(manifest, args.backend)
+    followers = followers_of(offsets, targets, n)
+    hot = np.argsort(np.diff(followers[0]))[::-1][:10]
+    profile = PROFILES[args.profile]
+    skews = args.skews if args.skews is not None else [profile['zipf']]
+    rng = np.random.default_rng(args.seed)
+    sample_miss = miss_sampler(args, rng)
+
+    print(f"--- [CACHE] {n} users, {len(targets)} follows, profil {args.profile}, {args.requests} requêtes ---")
+    rows = []
+    for zipf in skews:
+        stream = Stream(profile, n, zipf, args.requests, hot, rng)
+        for policy in args.policies:
+            for invalidation in args.invalidation:
+                for size in args.sizes:
+                    entries = capacity(size, n)
+                    result = simulate(stream, make_cache(policy, entries, args.ttl), followers,
+                                      invalidation == 'on', args.rps)
+                    mean, p99 = effective_latency(result['hit_mask'], args.hit_ms, sample_miss)
+                    rows.append({
+                        'POLICY': policy,
+                        'INVALIDATION': invalidation,
+                        'SIZE': entries,
+                        'SIZE_RATIO': round(entries / n, 4),
+                        'ZIPF': zipf,
+                        'READS': result['reads'],
+                        'HIT_RATIO': round(result['hit_ratio'], 4),
+                        'EFFECTIVE_MS': round(mean, 2),
+                        'EFFECTIVE_P99_MS': round(p99, 1),
+                        'STALE_RATIO': round(result['stale_ratio'], 4),
+                        'STALENESS_MEAN_S': round(result['staleness_mean'], 2),
+                        'STALENESS_MAX_S': round(result['staleness_max'], 2),
+                        'INVALIDATIONS_PER_POST': round(result['invalidations_per_post'], 2),
+                        'EVICTIONS': result['evictions'],
+                    })
+                    row = rows[-1]
+                    print(f"  zipf {zipf:<4} {policy:<3} inval {invalidation:<3} {entries:>7} entrées : "
+                          f"hit {row['HIT_RATIO']:.1%} | {row['EFFECTIVE_MS']}ms | périmés {row['STALE_RATIO']:.1%}")
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    with open(OUTPUT, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"\nDimensionnement (taux de hit >= {args.target_hit:.0%}) :")
+    best = sizing(rows, args.target_hit)
+    for zipf in skews:
+        for policy in args.policies:
+            for invalidation in args.invalidation:
+                row = best.get((policy, invalidation, zipf))
+                label = f"  zipf {zipf:<4} {policy:<3} inval {invalidation:<3}"
+                print(f"{label} : {row['SIZE']} entrées ({row['SIZE_RATIO']:.0%} des users)" if row
+                      else f"{label} : non atteint avec les tailles testées")
+    print(f"Résultats dans : {OUTPUT}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,40 +1,118 @@
 import argparse
-from google.cloud import datastore
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-def clean_datastore():
+from backend import add_backend_args, get_client
+from bulk import BulkWriter
+from instrument import Instrumentation, add_instrument_args
+
+KINDS = ['Post', 'User', 'Timeline']
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Vide le Datastore (Post, User, Timeline)")
+    p.add_argument('--kinds', nargs='+', default=KINDS)
+    p.add_argument('--page-size', type=int, default=2000, help="Clés lues par page (mémoire max)")
+    p.add_argument('--batch-size', type=int, default=400, help="Clés par delete_multi")
+    p.add_argument('--workers', type=int, default=8, help="delete_multi en parallèle par kind")
+    p.add_argument('--parallel-kinds', action='store_true', help="Vide tous les kinds en même temps")
+    add_backend_args(p)
+    add_instrument_args(p)
+    return p.parse_args()
+
+def iter_key_pages(client, kind, page_size):
+    cursor = None
+    while True:
+        query = client.query(kind=kind)
+        query.keys_only()
+        iterator = query.fetch(limit=page_size, start_cursor=cursor)
+        # Itère tous les lots jusqu'à la limite : Datastore peut renvoyer des lots partiels
+        # (more_results NOT_FINISHED), un lot court n'est donc pas la fin de la requête
+        keys = [entity.key for entity in iterator]
+        if not keys:
+            return
+        yield keys
+        # None quand more_results vaut NO_MORE_RESULTS
+        cursor = iterator.next_page_token
+        if cursor is None:
+            return
+
+def prefetch(pages, context=nullcontext):
+    # Lit la page suivante pendant que la page courante est supprimée ; context() entoure le travail
+    # du thread de lecture (mesure de son CPU)
+    buffer = queue.Queue(maxsize=1)
+    done = object()
+
+    def produce():
+        with context():
+            try:
+                for page in pages:
+                    buffer.put(page)
+            except Exception as e:
+                buffer.put(e)
+        buffer.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def delete_kind(client, kind, page_size=2000, batch_size=400, workers=8, instrumentation=None):
+    print(f"Suppression des entités '{kind}' (pages de {page_size})...")
+    instrumentation = instrumentation or Instrumentation()
+
+    label = f"Delete {kind}"
+    name = f"deletes:{kind}"
+    # CPU mesuré dans chaque thread du kind (lecture, suppressions) : exact avec --parallel-kinds
+    writer = BulkWriter(instrumentation.timed(client.delete_multi, label, phase=name), batch_size=batch_size,
+                        workers=workers, label=label)
+    with instrumentation.phase(name) as phase:
+        with writer:
+            for keys in prefetch(iter_key_pages(client, kind, page_size), lambda: instrumentation.worker(name)):
+                writer.extend(keys)
+        stats = writer.report()
+        phase['entities'] = stats['written']
+
+    if stats['written'] == 0 and stats['failed'] == 0:
+        print(f"Aucune entité '{kind}' trouvée.")
+    return stats
+
+def clean_datastore(kinds=KINDS, page_size=2000, batch_size=400, workers=8, parallel_kinds=False, backend=None,
+                    instrumentation=None):
     print("--- [CLEAN] NETTOYAGE DU DATASTORE ---")
-    
+    instrumentation = instrumentation or Instrumentation()
+
     try:
-        client = datastore.Client()
+        client = get_client(backend)
     except Exception as e:
         print(f"Erreur de connexion au Datastore: {e}")
         return
 
-    kinds = ['Post', 'User']
-    
-    for kind in kinds:
-        print(f"Recherche des entités '{kind}'...", end=" ", flush=True)
-        query = client.query(kind=kind)
-        query.keys_only()
-        
-        keys = list(query.fetch())
-        total_keys = len(keys)
-        
-        if total_keys == 0:
-            print("Aucune entité trouvée.")
-            continue
-
-        print(f"{total_keys} entités trouvées. Suppression en cours...")
-
-        chunk_size = 400
-        for i in range(0, total_keys, chunk_size):
-            chunk = keys[i:i + chunk_size]
-            client.delete_multi(chunk)
-            print(".", end="", flush=True)
-        
-        print(" Terminé.")
-    
+    if parallel_kinds:
+        with ThreadPoolExecutor(max_workers=len(kinds)) as pool:
+            results = list(pool.map(lambda k: delete_kind(client, k, page_size, batch_size, workers, instrumentation),
+                                    kinds))
+    else:
+        results = [delete_kind(client, k, page_size, batch_size, workers, instrumentation) for k in kinds]
+
+    failed = sum(r['failed'] for r in results)
+    if failed:
+        print(f"[CLEAN] ATTENTION: {failed} entités non supprimées.\n")
+        return False
+
     print("[CLEAN] Base de données vidée avec succès.\n")
+    return True
 
 if __name__ == "__main__":
-    clean_datastore()
+    args = parse_args()
+    instrumentation = Instrumentation(args.instrument, args.profiler, script='clean').start()
+    ok = clean_datastore(args.kinds, args.page_size, args.batch_size, args.workers, args.parallel_kinds, args.backend,
+                         instrumentation)
+    instrumentation.finish(failed=ok is False)
+    if ok is False:
+        exit(1)
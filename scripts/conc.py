@@ -1,20 +1,9 @@
-import os
-import subprocess
+import argparse
 import csv
-import time
-import pandas as pd
-
-# PATHS
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-HOME_DIR = os.path.dirname(PROJECT_ROOT)
-
-TARGET_HOST = "https://tpbigdata-473713.ew.r.appspot.com"
-OUTPUT_FILE = os.path.join(PROJECT_ROOT, 'out', 'conc.csv')
+import os
 
-LOCUST_FILE = os.path.join(SCRIPT_DIR, 'locustfile.py')
-CLEAN_SCRIPT = os.path.join(SCRIPT_DIR, 'clean.py')           # Nouveau script clean
-SEED_SCRIPT = os.path.join(HOME_DIR, 'massive-gcp', 'seed.py')
+from harness import (OUT_DIR, LocustCluster, Sweep, add_sweep_args, dataset_spec, ensure_dataset,
+                     load_user_classes, probe, result_fields, saturation_search)
 
 # PARAMS
 USER_STEPS = [1, 10, 20, 50, 100, 1000]
@@ -24,115 +13,76 @@ POSTS_PER_USER = 50
 FOLLOWERS_COUNT = 20
 TOTAL_POSTS_TO_SEED = TOTAL_USERS * POSTS_PER_USER
 
-def run_external_script(script_path, args=None):
-    if not os.path.exists(script_path):
-        print(f"ERREUR : Le script {script_path} est introuvable.")
-        exit(1)
-        
-    cmd = ["python3", script_path]
-    if args:
-        cmd.extend(args)
-        
-    try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"ERREUR lors de l'exécution de {os.path.basename(script_path)}: {e}")
-        exit(1)
+SEARCH_OUTPUT = os.path.join(OUT_DIR, 'conc_search.csv')
 
-def seed_database():
-    print(f"--- PEUPLEMENT DE LA BASE (SEED) ---")
-    print(f"Config: {TOTAL_USERS} users, {TOTAL_POSTS_TO_SEED} total posts.")
-    
-    args = [
-        "--users", str(TOTAL_USERS),
-        "--posts", str(TOTAL_POSTS_TO_SEED),
-        "--follows-min", str(FOLLOWERS_COUNT),
-        "--follows-max", str(FOLLOWERS_COUNT),
-        "--prefix", "user"
-    ]
-    run_external_script(SEED_SCRIPT, args)
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark de concurrence sur /api/timeline")
+    p.add_argument('--search', action='store_true', help="Recherche du point de saturation au lieu des paliers fixes")
+    p.add_argument('--slo-p99', type=float, default=500, help="SLO de latence p99 (ms)")
+    p.add_argument('--error-budget', type=float, default=0.01, help="Taux d'erreur max toléré")
+    p.add_argument('--start', type=int, default=1)
+    p.add_argument('--max-users', type=int, default=4096)
+    p.add_argument('--tolerance', type=float, default=0.1, help="Précision relative de la bisection")
+    p.add_argument('--run-time', type=int, default=20)
+    p.add_argument('--runs', type=int, default=1, help="Runs fusionnés par niveau testé")
+    p.add_argument('--no-seed', action='store_true')
+    p.add_argument('--distributed', action='store_true', help="Master locust + workers locaux")
+    p.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: un par coeur)")
+    add_sweep_args(p)
+    return p.parse_args()
 
-def clean_database():
-    run_external_script(CLEAN_SCRIPT)
+DATASET = dataset_spec(TOTAL_USERS, TOTAL_POSTS_TO_SEED, FOLLOWERS_COUNT)
 
-def run_benchmark():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    
-    print(f"--- LANCEMENT DU BENCHMARK ---")
-    print(f"Fichier de sortie : {OUTPUT_FILE}")
+SWEEP = Sweep(
+    name='conc',
+    param='Utilisateurs simultanés',
+    values=USER_STEPS,
+    users=lambda user_count: user_count,
+    dataset=lambda _: DATASET,
+    runs=RUNS_PER_STEP,
+)
 
-    with open(OUTPUT_FILE, 'w', newline='') as csvfile:
-        fieldnames = ['PARAM', 'AVG_TIME', 'RUN', 'FAILED']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for user_count in USER_STEPS:
-            print(f"=== Test avec {user_count} utilisateurs simultanés ===")
-            
-            for run in range(1, RUNS_PER_STEP + 1):
-                print(f"  -> Run {run}/{RUNS_PER_STEP}...", end=" ", flush=True)
-                
-                temp_csv_prefix = os.path.join(SCRIPT_DIR, "temp_locust")
-                
-                cmd = [
-                    "locust",
-                    "-f", LOCUST_FILE,
-                    "--headless",
-                    "-u", str(user_count),
-                    "-r", str(user_count), 
-                    "--run-time", "10s",
-                    "--host", TARGET_HOST,
-                    "--csv", temp_csv_prefix
-                ]
-                
-                try:
-                    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    
-                    stats_file = f"{temp_csv_prefix}_stats.csv"
-                    avg_time = 0
-                    failed = 1
-                    
-                    if os.path.exists(stats_file):
-                        try:
-                            df = pd.read_csv(stats_file)
-                            total_row = df[df['Name'] == 'Aggregated']
-                            if total_row.empty and not df.empty:
-                                total_row = df.iloc[[-1]]
+def run_search(args, cluster=None):
+    hist_dir = os.path.join(OUT_DIR, 'hist', 'conc_search')
+    os.makedirs(hist_dir, exist_ok=True)
+    user_classes = load_user_classes()
 
-                            if not total_row.empty:
-                                avg_time = int(total_row.iloc[0]['Average Response Time'])
-                                fail_count = int(total_row.iloc[0]['Failure Count'])
-                                failed = 1 if fail_count > 0 else 0
-                        except: pass
-                        
-                    writer.writerow({'PARAM': user_count, 'AVG_TIME': f"{avg_time}ms", 'RUN': run, 'FAILED': failed})
-                    print(f" Result: {avg_time}ms | Failed: {failed}")
-                    
-                    for ext in ['_stats.csv', '_failures.csv', '_stats_history.csv', '_exceptions.csv']:
-                        f_path = f"{temp_csv_prefix}{ext}"
-                        if os.path.exists(f_path): os.remove(f_path)
-                            
-                except Exception as e:
-                    print(f" Erreur: {e}")
-                    writer.writerow({'PARAM': user_count, 'AVG_TIME': "0ms", 'RUN': run, 'FAILED': 1})
+    print(f"--- RECHERCHE DE SATURATION (SLO p99 <= {args.slo_p99}ms, erreurs <= {args.error_budget:.1%}) ---")
 
-                time.sleep(2)
+    def measure(users):
+        return probe(users, args.run_time, args.runs, user_classes=user_classes,
+                     hist_path=os.path.join(hist_dir, f"{users}.json"), cluster=cluster)
 
-if __name__ == "__main__":
-    try:
-        import pandas
-        import locust
-        from google.cloud import datastore
-    except ImportError:
-        subprocess.run(["pip", "install", "pandas", "locust", "google-cloud-datastore"], check=True)
+    knee, history = saturation_search(measure, args.slo_p99, args.error_budget,
+                                      args.start, args.max_users, args.tolerance)
+
+    with open(SEARCH_OUTPUT, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=result_fields([row for _, row, _ in history]) + ['SLO_OK', 'KNEE'])
+        writer.writeheader()
+        for users, row, ok in sorted(history, key=lambda h: h[0]):
+            writer.writerow({**row, 'SLO_OK': int(ok), 'KNEE': int(users == knee)})
 
-    # 1. Clean via script externe
-    clean_database()
+    if knee is None:
+        print("\nAucun niveau de charge ne respecte le SLO.")
+    else:
+        row = next(row for users, row, _ in history if users == knee)
+        saturated = any(not ok for _, _, ok in history)
+        print(f"\nPoint de saturation : {knee} users -> {row['RPS']} req/s (p99 {row['P99_MS']}ms)"
+              + ("" if saturated else f" (max-users {args.max_users} atteint sans saturer)"))
+    print(f"Résultats dans : {SEARCH_OUTPUT}")
+
+if __name__ == "__main__":
+    args = parse_args()
+    workers = (args.workers or os.cpu_count() or 1) if args.distributed else 0
 
-    # 2. Seed via script externe
-    seed_database()
-    
-    # 3. Benchmark
-    run_benchmark()
-    
-    print(f"\nTerminé ! Résultats dans : {OUTPUT_FILE}")
+    if not args.search:
+        SWEEP.workers = workers
+        SWEEP.run(args.campaign)
+    else:
+        if not args.no_seed:
+            ensure_dataset(DATASET)
+        if workers:
+            with LocustCluster(workers) as cluster:
+                run_search(args, cluster)
+        else:
+            run_search(args)
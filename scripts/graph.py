@@ -0,0 +1,88 @@
+import numpy as np
+
+# Génération vectorisée du graphe de follows (format CSR : offsets + cibles),
+# sans liste "others" par utilisateur. Popularité uniforme ou Zipf, + comptes célébrités.
+
+DISTRIBUTIONS = ['uniform', 'zipf']
+MAX_SKEWED_ROUNDS = 20
+
+def popularity(n, dist='uniform', alpha=1.0, rng=None):
+    # Retourne (probabilités d'être suivi ou None si uniforme, utilisateurs triés par popularité)
+    rng = rng or np.random.default_rng()
+    order = rng.permutation(n)
+    if dist == 'uniform':
+        return None, order
+    if dist != 'zipf':
+        raise ValueError(f"Distribution inconnue: {dist}")
+    weights = np.empty(n)
+    weights[order] = np.arange(1, n + 1, dtype=float) ** -alpha
+    return weights / weights.sum(), order
+
+def sample_targets(rows, n, p, rng):
+    if p is None:
+        # Uniforme sur les n-1 autres utilisateurs : décale les tirages >= soi-même
+        targets = rng.integers(0, n - 1, size=rows.size)
+        return targets + (targets >= rows)
+    return rng.choice(n, size=rows.size, p=p)
+
+def sorted_unique(values):
+    values = np.sort(values)
+    if values.size == 0:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+def contains(sorted_codes, values):
+    if sorted_codes.size == 0:
+        return np.zeros(values.size, dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_codes, values), sorted_codes.size - 1)
+    return sorted_codes[idx] == values
+
+def insert_sorted(sorted_codes, values):
+    # values absentes de sorted_codes : insertion en O(E) sans retrier l'ensemble
+    values = np.sort(values)
+    return np.insert(sorted_codes, np.searchsorted(sorted_codes, values), values)
+
+def generate_follows(n, fmin, fmax, dist='uniform', alpha=1.0, celebrities=0, celebrity_reach=0.5, rng=None):
+    rng = rng or np.random.default_rng()
+    if n < 2:
+        return np.zeros(n + 1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    hi = min(fmax, n - 1)
+    lo = min(fmin, hi)
+    degrees = rng.integers(lo, hi + 1, size=n)
+    p, order = popularity(n, dist, alpha, rng)
+
+    # Arêtes codées src * n + dst, gardées triées et uniques
+    codes = np.zeros(0, dtype=np.int64)
+    need = degrees.copy()
+
+    # Célébrités : suivies par une fraction celebrity_reach des utilisateurs (dans la limite du degré)
+    for celebrity in order[:celebrities]:
+        followers = np.flatnonzero((rng.random(n) < celebrity_reach) & (need > 0))
+        followers = followers[followers != celebrity]
+        codes = insert_sorted(codes, followers.astype(np.int64) * n + celebrity)
+        need[followers] -= 1
+
+    rounds = 0
+    while need.any():
+        rows = np.repeat(np.arange(n, dtype=np.int64), need)
+        # Zipf très biaisé : les derniers manquants sont complétés uniformément
+        skewed = p if rounds < MAX_SKEWED_ROUNDS else None
+        targets = sample_targets(rows, n, skewed, rng)
+        keep = targets != rows
+        candidates = sorted_unique(rows[keep] * n + targets[keep])
+        fresh = candidates[~contains(codes, candidates)]
+        codes = insert_sorted(codes, fresh)
+        need -= np.bincount(fresh // n, minlength=n)
+        rounds += 1
+
+    sources = codes // n
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return offsets, codes % n
+
+def follows_of(offsets, targets, i):
+    return targets[offsets[i]:offsets[i + 1]]
+
+def in_degrees(targets, n):
+    return np.bincount(targets, minlength=n)
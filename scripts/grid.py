@@ -0,0 +1,261 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+
+import numpy as np
+
+from harness import DATASET_SEED, OUT_DIR, Sweep, add_sweep_args, dataset_spec
+
+# Sweep multi-dimensionnel concurrence × posts/utilisateur × followees/utilisateur : grille complète
+# ou hypercube latin, paliers regroupés par dataset pour limiter les reseeds, puis surface de
+# réponse log-log avec interactions (ex. fanout élevé sous forte concurrence).
+
+# PARAMS
+USER_LEVELS = [10, 50, 100]
+POST_LEVELS = [10, 50, 100]
+FOLLOW_LEVELS = [10, 50, 100]
+DB_TOTAL_USERS = 1000
+RUNS_PER_STEP = 2
+
+DIMENSIONS = ['users', 'posts', 'follows']
+COLUMNS = {'users': 'USERS', 'posts': 'POSTS_PER_USER', 'follows': 'FOLLOWS'}
+METRICS = ['AVG_MS', 'P99_MS']
+# |t| au-delà duquel un terme est considéré significatif (~5% bilatéral)
+T_SIGNIFICANT = 2.0
+
+OUTPUT = os.path.join(OUT_DIR, 'grid.csv')
+MODEL_OUTPUT = os.path.join(OUT_DIR, 'grid_model.json')
+PLOT_OUTPUT = os.path.join(OUT_DIR, 'grid.png')
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Sweep concurrence × posts × followees et surface de réponse")
+    p.add_argument('--design', choices=['grid', 'lhs'], default='grid',
+                   help="Grille complète ou hypercube latin (--samples points)")
+    p.add_argument('--users', type=int, nargs='+', default=USER_LEVELS, help="Niveaux de concurrence")
+    p.add_argument('--posts', type=int, nargs='+', default=POST_LEVELS, help="Niveaux de posts par utilisateur")
+    p.add_argument('--follows', type=int, nargs='+', default=FOLLOW_LEVELS, help="Niveaux de followees")
+    p.add_argument('--samples', type=int, default=12, help="(lhs) Nombre de points")
+    p.add_argument('--dataset-levels', type=int, default=3,
+                   help="(lhs) Niveaux distincts par dimension du dataset, pour borner le nombre de reseeds")
+    p.add_argument('--seed', type=int, default=DATASET_SEED,
+                   help="(lhs) Graine du tirage (BENCH_SEED par défaut : même plan à la reprise d'une campagne)")
+    p.add_argument('--runs', type=int, default=RUNS_PER_STEP)
+    p.add_argument('--plan', action='store_true', help="Affiche l'ordre des paliers sans lancer le benchmark")
+    p.add_argument('--fit-only', action='store_true', help="Ajuste le modèle sur out/grid.csv sans relancer")
+    add_sweep_args(p)
+    return p.parse_args()
+
+def grid_points(users, posts, follows):
+    return [dict(zip(DIMENSIONS, values)) for values in itertools.product(users, posts, follows)]
+
+def snap(values, levels):
+    # Niveau le plus proche en échelle log
+    levels = np.asarray(levels, dtype=float)
+    return [int(levels[np.argmin(np.abs(np.log(levels) - np.log(v)))]) for v in values]
+
+def lhs_points(users, posts, follows, samples, dataset_levels=3, rng=None):
+    # Une strate par point et par dimension, tirée en log entre le min et le max des niveaux ;
+    # posts et followees sont ramenés sur quelques niveaux pour que les datasets se répètent.
+    rng = rng or np.random.default_rng()
+    columns = {}
+    for name, levels in zip(DIMENSIONS, (users, posts, follows)):
+        lo, hi = np.log(min(levels)), np.log(max(levels))
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        values = np.exp(lo + strata * (hi - lo))
+        if name == 'users':
+            columns[name] = [int(round(v)) for v in values]
+        else:
+            columns[name] = snap(values, np.geomspace(min(levels), max(levels), dataset_levels).round())
+
+    points, seen = [], set()
+    for values in zip(*(columns[name] for name in DIMENSIONS)):
+        if values not in seen:
+            seen.add(values)
+            points.append(dict(zip(DIMENSIONS, values)))
+    return points
+
+def order_points(points):
+    # Un seul seed par dataset (posts, followees) : les paliers sont groupés par dataset, les posts
+    # croissent (seed --diff n'ajoute que les nouveaux) et les followees vont en serpentin pour que
+    # deux datasets consécutifs ne diffèrent que d'une dimension.
+    datasets = {}
+    for point in points:
+        datasets.setdefault((point['posts'], point['follows']), []).append(point)
+
+    ordered = []
+    for i, posts in enumerate(sorted({p for p, _ in datasets})):
+        follows = sorted(f for p, f in datasets if p == posts)
+        for f in (follows if i % 2 == 0 else reversed(follows)):
+            ordered.extend(sorted(datasets[(posts, f)], key=lambda point: point['users']))
+    return ordered, len(datasets)
+
+def label(point):
+    return f"u{point['users']}-p{point['posts']}-f{point['follows']}"
+
+def make_sweep(points, runs=RUNS_PER_STEP):
+    return Sweep(
+        name='grid',
+        param='Concurrence × posts × followees',
+        values=points,
+        users=lambda point: point['users'],
+        dataset=lambda point: dataset_spec(DB_TOTAL_USERS, DB_TOTAL_USERS * point['posts'], point['follows']),
+        runs=runs,
+        label=label,
+        columns=lambda point: {COLUMNS[name]: point[name] for name in DIMENSIONS},
+    )
+
+def load_grid(path=OUTPUT):
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                if int(float(row.get('FAILED') or 0)):
+                    continue
+                rows.append({key: float(row[key]) for key in list(COLUMNS.values()) + METRICS})
+            except (KeyError, TypeError, ValueError):
+                continue
+    return rows
+
+def design_matrix(logs, center):
+    # Modèle log-log centré : effets principaux + interactions deux à deux
+    x = {name: logs[name] - center[name] for name in DIMENSIONS}
+    terms = {'constante': np.ones(len(x['users']))}
+    terms.update(x)
+    for a, b in itertools.combinations(DIMENSIONS, 2):
+        terms[f"{a}×{b}"] = x[a] * x[b]
+    return list(terms), np.column_stack(list(terms.values()))
+
+def fit_surface(rows, metric):
+    rows = [r for r in rows if r[metric] > 0]
+    logs = {name: np.log([r[COLUMNS[name]] for r in rows]) for name in DIMENSIONS}
+    center = {name: float(values.mean()) for name, values in logs.items()}
+    names, X = design_matrix(logs, center)
+    if len(rows) <= X.shape[1]:
+        return None
+    # Termes d'interaction sans variation (dimension à un seul niveau) : retirés
+    keep = [i for i in range(X.shape[1]) if i == 0 or np.ptp(X[:, i]) > 1e-9]
+    names, X = [names[i] for i in keep], X[:, keep]
+
+    y = np.log([r[metric] for r in rows])
+    coef, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    residuals = y - X @ coef
+    dof = len(y) - rank
+    sigma2 = float(residuals @ residuals) / dof if dof > 0 else float('nan')
+    se = np.sqrt(np.clip(np.diag(np.linalg.pinv(X.T @ X)) * sigma2, 0, None))
+    total = float(np.sum((y - y.mean()) ** 2))
+    r2 = 1 - float(residuals @ residuals) / total if total else 1.0
+
+    terms = []
+    for name, c, s in zip(names, coef, se):
+        t = float(c / s) if s > 0 else float('inf')
+        terms.append({'term': name, 'coef': round(float(c), 4), 'se': round(float(s), 4),
+                      't': round(t, 2), 'significant': bool(abs(t) >= T_SIGNIFICANT)})
+    return {'metric': metric, 'model': f"ln({metric}) ~ ln(users) * ln(posts) * ln(follows) (ordre 2)",
+            'observations': len(rows), 'r2': round(r2, 4), 'center': center, 'terms': terms}
+
+def predict(model, users, posts, follows):
+    coef = {t['term']: t['coef'] for t in model['terms']}
+    logs = {'users': np.log(users), 'posts': np.log(posts), 'follows': np.log(follows)}
+    x = {name: logs[name] - model['center'][name] for name in DIMENSIONS}
+    value = coef.get('constante', 0.0) + sum(coef.get(name, 0.0) * x[name] for name in DIMENSIONS)
+    for a, b in itertools.combinations(DIMENSIONS, 2):
+        value = value + coef.get(f"{a}×{b}", 0.0) * x[a] * x[b]
+    return np.exp(value)
+
+def elasticity(model, name, at):
+    # d ln(latence) / d ln(name) au point `at` (valeurs brutes des autres dimensions)
+    coef = {t['term']: t['coef'] for t in model['terms']}
+    value = coef.get(name, 0.0)
+    for other in DIMENSIONS:
+        if other != name:
+            key = f"{name}×{other}" if f"{name}×{other}" in coef else f"{other}×{name}"
+            value += coef.get(key, 0.0) * (np.log(at[other]) - model['center'][other])
+    return float(value)
+
+def print_model(model, rows):
+    print(f"\n--- SURFACE DE RÉPONSE {model['metric']} ({model['observations']} runs, R² {model['r2']:.3f}) ---")
+    for t in model['terms']:
+        flag = "significatif" if t['significant'] else ""
+        print(f"  {t['term']:<16} {t['coef']:+.4f} ± {t['se']:.4f} (t={t['t']:+.2f}) {flag}")
+
+    # Lecture des interactions : élasticité au fanout à faible et forte concurrence
+    lo, hi = min(r['USERS'] for r in rows), max(r['USERS'] for r in rows)
+    posts = float(np.exp(model['center']['posts']))
+    for users in (lo, hi):
+        e = elasticity(model, 'follows', {'users': users, 'posts': posts})
+        print(f"  Élasticité au fanout à {users:g} users : latence ∝ follows^{e:.2f}")
+
+def plot_surface(model, rows, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    metric = model['metric']
+    levels = sorted({r['POSTS_PER_USER'] for r in rows})
+    users = np.geomspace(min(r['USERS'] for r in rows), max(r['USERS'] for r in rows), 60)
+    follows = np.geomspace(min(r['FOLLOWS'] for r in rows), max(r['FOLLOWS'] for r in rows), 60)
+    U, F = np.meshgrid(users, follows)
+    values = [r[metric] for r in rows]
+    norm = LogNorm(vmin=min(values), vmax=max(values))
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, axes = plt.subplots(1, len(levels), figsize=(5.5 * len(levels), 5), squeeze=False, sharey=True)
+    for ax, posts in zip(axes[0], levels):
+        surface = ax.contourf(U, F, predict(model, U, posts, F), levels=np.geomspace(norm.vmin, norm.vmax, 15),
+                              norm=norm, cmap='viridis', extend='both')
+        measured = [r for r in rows if r['POSTS_PER_USER'] == posts]
+        ax.scatter([r['USERS'] for r in measured], [r['FOLLOWS'] for r in measured],
+                   c=[r[metric] for r in measured], norm=norm, cmap='viridis', edgecolors='white', s=60, clip_on=False, zorder=3)
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_title(f"{posts:g} posts / utilisateur")
+        ax.set_xlabel("Utilisateurs simultanés")
+    axes[0][0].set_ylabel("Followees par utilisateur")
+    fig.colorbar(surface, ax=axes[0].tolist(), label=f"{metric} (modèle ; points = mesures)", format='%.0f')
+    fig.suptitle(f"Surface de réponse {metric} (R² {model['r2']:.2f})", fontsize=14)
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+def fit(path=OUTPUT):
+    if not os.path.exists(path):
+        print(f"{path} introuvable, lancer le sweep d'abord.")
+        return 2
+    rows = load_grid(path)
+    models = [m for m in (fit_surface(rows, metric) for metric in METRICS) if m]
+    if not models:
+        print(f"Pas assez de runs valides ({len(rows)}) pour ajuster la surface de réponse.")
+        return 2
+    for model in models:
+        print_model(model, rows)
+    with open(MODEL_OUTPUT, 'w') as f:
+        json.dump(models, f, indent=2, ensure_ascii=False)
+    print(f"\nModèles dans : {MODEL_OUTPUT}")
+    print(f"Graphique : {plot_surface(models[0], rows, PLOT_OUTPUT)}")
+    return 0
+
+def main():
+    args = parse_args()
+    if args.fit_only:
+        return fit()
+
+    if args.design == 'grid':
+        points = grid_points(args.users, args.posts, args.follows)
+    else:
+        points = lhs_points(args.users, args.posts, args.follows, args.samples, args.dataset_levels,
+                            np.random.default_rng(args.seed))
+    points, datasets = order_points(points)
+    print(f"--- PLAN ({args.design}) : {len(points)} paliers, {datasets} datasets (reseeds) ---")
+    for point in points:
+        print(f"  {label(point)}")
+    if args.plan:
+        return 0
+
+    make_sweep(points, args.runs).run(args.campaign)
+    return fit()
+
+if __name__ == "__main__":
+    exit(main())
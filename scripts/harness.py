@@ -0,0 +1,581 @@
+import csv
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+# DEPENDANCES
+try:
+    import locust
+    import numpy
+    from google.cloud import datastore
+except ImportError:
+    subprocess.run([sys.executable, "-m", "pip", "install", "locust", "numpy", "google-cloud-datastore"], check=True)
+
+# locust doit être importé avant le reste (monkey patching gevent)
+import gevent
+import psutil
+from locust import HttpUser
+from locust.env import Environment
+from locust.log import setup_logging
+from locust.runners import WORKER_REPORT_INTERVAL
+
+from backend import DATASET_FILE, DEFAULT_BACKEND
+from histogram import Histogram, PERCENTILES, percentile_label
+from instrument import PROFILERS
+from results import DEFAULT_CAMPAIGN, ResultsLog, fingerprint
+from servertiming import TimingCollector, describe, merge, window_row
+from timeseries import WARMUP_S, StatsSampler, load_rows, point_rows, save_rows, steady_state, summarize
+
+# PATHS
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+OUT_DIR = os.path.join(PROJECT_ROOT, 'out')
+
+TARGET_HOST = os.environ.get("BENCH_HOST", "https://tpbigdata-473713.ew.r.appspot.com")
+
+LOCUST_FILE = os.path.join(SCRIPT_DIR, 'locustfile.py')
+CLEAN_SCRIPT = os.path.join(SCRIPT_DIR, 'clean.py')
+SEED_SCRIPT = os.path.join(SCRIPT_DIR, 'seed.py')
+SNAPSHOT_SCRIPT = os.path.join(SCRIPT_DIR, 'snapshot.py')
+
+# Graine des datasets générés (même graphe et mêmes posts d'une campagne à l'autre)
+DATASET_SEED = int(os.environ.get("BENCH_SEED", "42"))
+# Snapshots par empreinte de dataset : BENCH_SNAPSHOTS=1 les exporte après chaque seed
+SNAPSHOT_DIR = os.path.join(OUT_DIR, 'snapshots')
+SNAPSHOTS = os.environ.get("BENCH_SNAPSHOTS") == "1"
+# Instrumentation de seed.py / clean.py : BENCH_INSTRUMENT=1, ou cprofile / sample pour un profil en plus.
+# Les rapports JSON (out/instrument/) sont joints aux runs de l'étape dans out/results.jsonl.
+INSTRUMENT = os.environ.get("BENCH_INSTRUMENT", "")
+INSTRUMENT_DIR = os.path.join(OUT_DIR, 'instrument')
+INSTRUMENTED_SCRIPTS = (CLEAN_SCRIPT, SEED_SCRIPT)
+_instrumentation = []
+
+# Durée d'un run : le warm-up (WARMUP_S) est exclu des résultats
+RUN_TIME = 30
+
+# Générateur de charge saturé : plus de CPU_SATURATED_SHARE des échantillons au-dessus de CPU_LIMIT %
+CPU_LIMIT = 90
+CPU_SATURATED_SHARE = 0.2
+
+def run_external_script(script_path, args=None):
+    if not os.path.exists(script_path):
+        print(f"ERREUR : Le script {script_path} est introuvable.")
+        exit(1)
+
+    cmd = [sys.executable, script_path]
+    if args:
+        cmd.extend(args)
+    report_path = None
+    if INSTRUMENT and script_path in INSTRUMENTED_SCRIPTS:
+        name = os.path.splitext(os.path.basename(script_path))[0]
+        report_path = os.path.join(INSTRUMENT_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{len(_instrumentation)}.json")
+        cmd.extend(["--instrument", report_path])
+        if INSTRUMENT in PROFILERS:
+            cmd.extend(["--profiler", INSTRUMENT])
+
+    try:
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"ERREUR lors de l'exécution de {os.path.basename(script_path)}: {e}")
+        exit(1)
+
+    if report_path and os.path.exists(report_path):
+        with open(report_path) as f:
+            _instrumentation.append({'report': os.path.relpath(report_path, OUT_DIR), **json.load(f)})
+
+def pop_instrumentation():
+    # Rapports des seed/clean lancés depuis le dernier appel (préparation de l'étape courante)
+    reports = list(_instrumentation)
+    _instrumentation.clear()
+    return reports
+
+def clean_database():
+    run_external_script(CLEAN_SCRIPT)
+    if os.path.exists(DATASET_FILE):
+        os.remove(DATASET_FILE)
+
+def seed_database(users, posts, follows, diff=False, prefix="user", extra_args=None):
+    print(f"--- SEEDING: {users} users | {posts} posts | {follows} follows/user ---")
+
+    args = [
+        "--users", str(users),
+        "--posts", str(posts),
+        "--follows-min", str(follows),
+        "--follows-max", str(follows),
+        "--prefix", prefix
+    ]
+    if diff:
+        args.append("--diff")
+    if extra_args:
+        args.extend(extra_args)
+    run_external_script(SEED_SCRIPT, args)
+
+def dataset_spec(users, posts, follows, prefix="user", extra_args=None, seed=DATASET_SEED):
+    return {
+        'users': users,
+        'posts': posts,
+        'follows': follows,
+        'prefix': prefix,
+        'extra_args': list(extra_args or []),
+        'seed': seed,
+        'backend': DEFAULT_BACKEND,
+    }
+
+def read_manifest():
+    try:
+        with open(DATASET_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def invalidate_dataset():
+    # Le dataset a été modifié (charge en écriture) : le prochain ensure_dataset refait un diff
+    manifest = read_manifest()
+    if manifest is not None and manifest.get('fingerprint'):
+        manifest['fingerprint'] = None
+        with open(DATASET_FILE, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+def ensure_dataset(spec):
+    fp = fingerprint(spec)
+    manifest = read_manifest()
+    if manifest is not None and manifest.get('fingerprint') == fp:
+        print(f"[Dataset] Inchangé ({fp}), pas de reseed.")
+        return fp
+
+    snapshot = os.path.join(SNAPSHOT_DIR, f"{fp}.npz")
+    if manifest is None and os.path.exists(snapshot):
+        # Base d'état inconnu : le snapshot remplace clean + seed complet (même coût, mêmes IDs).
+        # Sinon seed --diff ne réécrit que ce qui change, bien moins qu'un import complet.
+        print(f"[Dataset] Restauration du snapshot {os.path.basename(snapshot)}")
+        run_external_script(SNAPSHOT_SCRIPT, ["import", snapshot, "--clean"])
+        return fp
+
+    if manifest is None:
+        # État inconnu : on repart d'une base vide
+        clean_database()
+    extra_args = spec['extra_args'] + ["--fingerprint", fp]
+    if spec.get('seed') is not None:
+        extra_args += ["--seed", str(spec['seed'])]
+    seed_database(spec['users'], spec['posts'], spec['follows'], diff=manifest is not None, prefix=spec['prefix'],
+                  extra_args=extra_args)
+    if SNAPSHOTS:
+        run_external_script(SNAPSHOT_SCRIPT, ["export", snapshot])
+    return fp
+
+def load_user_classes(path=LOCUST_FILE):
+    spec = importlib.util.spec_from_file_location("locustfile", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return [
+        value for value in vars(module).values()
+        if isinstance(value, type) and issubclass(value, HttpUser)
+        and value is not HttpUser and not getattr(value, 'abstract', False)
+    ]
+
+def configure_users(user_classes, attributes, cluster=None):
+    # Attributs de classe des users pour l'étape (ex. timeline_mode), appliqués ici et envoyés aux
+    # workers du cluster (message "update_user_class" de locust)
+    for user_class in user_classes:
+        for key, value in attributes.items():
+            setattr(user_class, key, value)
+        if cluster is not None:
+            cluster.runner.send_message("update_user_class", {'user_class_name': user_class.__name__, **attributes})
+
+class CpuSampler:
+    def __init__(self, pids, interval=1.0):
+        self.processes = [psutil.Process(pid) for pid in pids]
+        self.interval = interval
+        self.samples = []
+        self.greenlet = None
+
+    def _loop(self):
+        while True:
+            gevent.sleep(self.interval)
+            usage = []
+            for process in self.processes:
+                try:
+                    usage.append(process.cpu_percent(None))
+                except psutil.Error:
+                    pass
+            # Le process le plus chargé est celui qui limite
+            if usage:
+                self.samples.append(max(usage))
+
+    def start(self):
+        for process in self.processes:
+            process.cpu_percent(None)
+        self.greenlet = gevent.spawn(self._loop)
+        return self
+
+    def stop(self):
+        self.greenlet.kill(block=True)
+        if not self.samples:
+            return {'cpu_mean': 0.0, 'cpu_max': 0.0, 'cpu_saturated': False}
+        hot = sum(1 for s in self.samples if s >= CPU_LIMIT)
+        return {
+            'cpu_mean': sum(self.samples) / len(self.samples),
+            'cpu_max': max(self.samples),
+            'cpu_saturated': hot / len(self.samples) > CPU_SATURATED_SHARE,
+        }
+
+def collect_result(env, cpu, points, timing, warmup=WARMUP_S):
+    # Résultats calculés sur le régime stable uniquement (après warm-up)
+    steady_from, steady = steady_state(points, warmup)
+    window = points[steady_from:]
+    if window and any(p['requests'] for p in window):
+        result = summarize(window)
+    else:
+        total = env.stats.total
+        result = {
+            'avg_time': total.avg_response_time,
+            'requests': total.num_requests,
+            'failures': total.num_failures,
+            'rps': total.total_rps,
+            'fail_ratio': total.fail_ratio,
+            'histogram': Histogram.from_locust(total),
+        }
+    result.update(cpu)
+    result['steady'] = steady
+    result['steady_index'] = steady_from
+    result['steady_from'] = window[0]['t'] - window[0]['duration'] if window else 0.0
+    result['points'] = points
+    # Server-Timing sur la même fenêtre que la latence client (hors warm-up)
+    if window and all('timing' in p for p in window):
+        result['timing'] = merge(p['timing'] for p in window)
+    else:
+        result['timing'] = timing.snapshot()
+    result['server_timing'] = window_row([result['timing']])
+    return result
+
+def run_locust(users, run_time=RUN_TIME, spawn_rate=None, host=TARGET_HOST, user_classes=None, cluster=None,
+               warmup=WARMUP_S, listeners=()):
+    if cluster is not None:
+        return cluster.run(users, run_time, spawn_rate, warmup)
+
+    # Locust dans le même process : pas de fork CLI ni d'interpréteur par run
+    env = Environment(user_classes=user_classes or load_user_classes(), host=host)
+    runner = env.create_local_runner()
+    timing = TimingCollector(env.events)
+    for attach in listeners:
+        attach(env.events)
+    sampler = CpuSampler([os.getpid()]).start()
+    series = StatsSampler(env.stats, timing=timing).start()
+    runner.start(users, spawn_rate=spawn_rate or users)
+    gevent.spawn_later(run_time, runner.quit)
+    runner.greenlet.join()
+
+    return collect_result(env, sampler.stop(), series.stop(), timing, warmup)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class LocustCluster:
+    # Un master locust dans ce process + N workers locaux, gardés pour tout le sweep
+    def __init__(self, workers=None, host=TARGET_HOST, locust_file=LOCUST_FILE, user_classes=None, connect_timeout=60):
+        self.workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.locust_file = locust_file
+        self.user_classes = user_classes
+        self.connect_timeout = connect_timeout
+        self.env = None
+        self.runner = None
+        self.timing = None
+        self.procs = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self):
+        port = free_port()
+        self.env = Environment(user_classes=self.user_classes or load_user_classes(self.locust_file), host=self.host)
+        self.runner = self.env.create_master_runner(master_bind_host="127.0.0.1", master_bind_port=port)
+        self.timing = TimingCollector(self.env.events)
+
+        cmd = [sys.executable, "-m", "locust", "-f", self.locust_file, "--worker",
+               "--master-host", "127.0.0.1", "--master-port", str(port), "--loglevel", "ERROR"]
+        self.procs = [subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                      for _ in range(self.workers)]
+
+        print(f"[Locust] Master + {self.workers} workers, attente des connexions...", end=" ", flush=True)
+        deadline = time.time() + self.connect_timeout
+        while len(self.runner.clients.ready) < self.workers:
+            if time.time() > deadline:
+                self.close()
+                raise RuntimeError(f"{len(self.runner.clients.ready)}/{self.workers} workers connectés")
+            gevent.sleep(0.2)
+        print("OK")
+        return self
+
+    def run(self, users, run_time=RUN_TIME, spawn_rate=None, warmup=WARMUP_S):
+        self.env.stats.reset_all()
+        self.timing.reset()
+        sampler = CpuSampler([p.pid for p in self.procs] + [os.getpid()]).start()
+        series = StatsSampler(self.env.stats, interval=WORKER_REPORT_INTERVAL, timing=self.timing).start()
+        self.runner.start(users, spawn_rate=spawn_rate or users)
+        gevent.sleep(run_time)
+        self.runner.stop()
+        # Dernier rapport de stats des workers
+        gevent.sleep(1.5)
+        return collect_result(self.env, sampler.stop(), series.stop(), self.timing, warmup)
+
+    def close(self):
+        if self.runner is not None:
+            self.runner.quit()
+            self.runner = None
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self.procs = []
+
+RESULT_FIELDS = (
+    ['PARAM', 'RUN', 'AVG_MS']
+    + [f"{percentile_label(q)}_MS" for q in PERCENTILES]
+    + ['MAX_MS', 'RPS', 'REQUESTS', 'FAIL_RATIO', 'FAILED', 'CPU_MEAN', 'CPU_MAX', 'CPU_SATURATED',
+       'STEADY', 'STEADY_FROM_S', 'HIST']
+)
+
+def result_row(value, run, result, hist_path):
+    row = {
+        'PARAM': value,
+        'RUN': run,
+        'AVG_MS': round(result['avg_time'], 1),
+        'RPS': round(result['rps'], 2),
+        'REQUESTS': result['requests'],
+        'FAIL_RATIO': round(result['fail_ratio'], 4),
+        'FAILED': 1 if result['failures'] > 0 or result['requests'] == 0 else 0,
+        'CPU_MEAN': round(result['cpu_mean'], 1),
+        'CPU_MAX': round(result['cpu_max'], 1),
+        'CPU_SATURATED': int(result['cpu_saturated']),
+        # Vide : pas assez de ticks après le warm-up pour vérifier le régime stable
+        'STEADY': '' if result['steady'] is None else int(result['steady']),
+        'STEADY_FROM_S': round(result['steady_from'], 1),
+        'HIST': os.path.relpath(hist_path, OUT_DIR),
+    }
+    row.update(result['histogram'].summary())
+    row.update(result.get('server_timing') or {})
+    return row
+
+def result_fields(rows):
+    # Colonnes fixes + colonnes propres au serveur testé (phases Server-Timing)
+    extra = sorted({key for row in rows for key in row if key not in RESULT_FIELDS})
+    return RESULT_FIELDS + extra
+
+def failed_row(value, run):
+    return {**{field: 0 for field in RESULT_FIELDS}, 'PARAM': value, 'RUN': run, 'FAIL_RATIO': 1, 'FAILED': 1, 'HIST': ''}
+
+def probe(users, run_time=RUN_TIME, runs=1, host=TARGET_HOST, user_classes=None, hist_path=None, cluster=None):
+    # Plusieurs runs au même niveau de charge, histogrammes fusionnés
+    results = [run_locust(users, run_time, host=host, user_classes=user_classes, cluster=cluster) for _ in range(runs)]
+    n = sum(r['requests'] for r in results)
+    failures = sum(r['failures'] for r in results)
+    merged = results[0]
+    for result in results[1:]:
+        merged['histogram'].merge(result['histogram'])
+    merged['avg_time'] = sum(r['avg_time'] * r['requests'] for r in results) / n if n else 0
+    # Runs de même durée : débit et CPU moyens par run
+    merged['rps'] = sum(r['rps'] for r in results) / runs
+    merged['requests'] = n
+    merged['failures'] = failures
+    merged['fail_ratio'] = failures / n if n else 1
+    merged['cpu_mean'] = sum(r['cpu_mean'] for r in results) / runs
+    merged['cpu_max'] = max(r['cpu_max'] for r in results)
+    merged['cpu_saturated'] = any(r['cpu_saturated'] for r in results)
+    steady = [r['steady'] for r in results]
+    merged['steady'] = False if False in steady else (None if None in steady else True)
+    merged['steady_from'] = max(r['steady_from'] for r in results)
+    # Server-Timing pondéré par les requêtes instrumentées de chaque run
+    merged['server_timing'] = window_row([r['timing'] for r in results])
+    if hist_path:
+        merged['histogram'].save(hist_path, users=users, runs=runs)
+    return result_row(users, runs, merged, hist_path or OUT_DIR)
+
+def meets_slo(row, p99_slo, error_budget):
+    return row['REQUESTS'] > 0 and row['P99_MS'] <= p99_slo and row['FAIL_RATIO'] <= error_budget
+
+def saturation_search(measure, p99_slo, error_budget=0.01, start=1, max_users=4096, tolerance=0.1):
+    # 1. Montée exponentielle jusqu'au premier niveau hors SLO
+    # 2. Bisection entre le dernier niveau OK et le premier KO
+    history = []
+
+    def step(users):
+        row = measure(users)
+        ok = meets_slo(row, p99_slo, error_budget)
+        history.append((users, row, ok))
+        print(f"  -> {users} users: p99 {row['P99_MS']}ms | {row['RPS']} req/s | "
+              f"erreurs {row['FAIL_RATIO']:.2%} | {'OK' if ok else 'HORS SLO'}"
+              + (" | CPU INJECTEUR SATURÉ" if row['CPU_SATURATED'] else ""))
+        return ok
+
+    good, bad = None, None
+    users = start
+    while users <= max_users:
+        if step(users):
+            good = users
+            if users == max_users:
+                break
+            # Dernier palier ramené à max_users, qui est toujours mesuré
+            users = min(users * 2, max_users)
+        else:
+            bad = users
+            break
+
+    if good is None or bad is None:
+        return good, history
+
+    while bad - good > max(1, int(good * tolerance)):
+        mid = (good + bad) // 2
+        if step(mid):
+            good = mid
+        else:
+            bad = mid
+
+    return good, history
+
+def add_sweep_args(parser):
+    parser.add_argument('--campaign', default=DEFAULT_CAMPAIGN,
+                        help="Campagne de mesures : les runs déjà présents dans out/results.jsonl sont sautés")
+
+class Sweep:
+    def __init__(self, name, param, values, users, dataset=None, setup=None, before=None,
+                 runs=3, run_time=RUN_TIME, warmup=WARMUP_S, pause=2, host=TARGET_HOST, locust_file=LOCUST_FILE,
+                 workers=0, label=str, columns=None, user_attributes=None):
+        self.name = name
+        self.param = param
+        self.values = values
+        self.users = users
+        self.dataset = dataset
+        self.setup = setup
+        self.before = before
+        self.runs = runs
+        self.run_time = run_time
+        self.warmup = warmup
+        self.pause = pause
+        self.host = host
+        self.locust_file = locust_file
+        self.workers = workers
+        # Paliers non scalaires (grille) : libellé des fichiers/colonne PARAM et colonnes propres au palier
+        self.label = label
+        self.columns = columns
+        # Attributs des classes de users propres au palier (ex. mode de lecture de la timeline)
+        self.user_attributes = user_attributes
+        self.output = os.path.join(OUT_DIR, f"{name}.csv")
+
+    def users_for(self, value):
+        return self.users(value) if callable(self.users) else self.users
+
+    def run(self, campaign=DEFAULT_CAMPAIGN):
+        setup_logging("ERROR")
+        user_classes = load_user_classes(self.locust_file)
+
+        cluster = None
+        if self.workers:
+            cluster = LocustCluster(self.workers, self.host, self.locust_file, user_classes).start()
+        try:
+            return self._run(campaign, user_classes, cluster)
+        finally:
+            if cluster is not None:
+                cluster.close()
+
+    def write_csv(self, log, campaign):
+        entries = log.select(campaign, self.name)
+        order = {json.dumps(v): i for i, v in enumerate(self.values)}
+        entries.sort(key=lambda e: (order.get(json.dumps(e['param']), len(order)), e['run']))
+        rows = [entry['row'] for entry in entries]
+        with open(self.output, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=result_fields(rows), restval='')
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def _run(self, campaign, user_classes, cluster):
+        log = ResultsLog()
+        hist_dir = os.path.join(OUT_DIR, 'hist', campaign, self.name)
+        timeseries_path = os.path.join(OUT_DIR, 'timeseries', campaign, f"{self.name}.parquet")
+        os.makedirs(hist_dir, exist_ok=True)
+        timeseries = load_rows(timeseries_path)
+        writes = any(getattr(c, 'writes', False) for c in user_classes)
+
+        print(f"--- LANCEMENT DU BENCHMARK (Variable: {self.param}, campagne: {campaign}) ---")
+        print(f"Fichier de sortie : {self.output}")
+
+        if self.before:
+            self.before()
+
+        for value in self.values:
+            spec = self.dataset(value) if self.dataset else None
+            dataset = fingerprint(spec)
+            todo = [run for run in range(1, self.runs + 1) if not log.done(campaign, self.name, value, run, dataset)]
+
+            print(f"\n=============================================")
+            print(f" ÉTAPE : {self.param} = {self.label(value)}")
+            print(f"=============================================")
+
+            if not todo:
+                print("  Déjà mesurée dans cette campagne, étape sautée.")
+                continue
+
+            pop_instrumentation()
+            if spec is not None:
+                ensure_dataset(spec)
+            if self.setup:
+                self.setup(value)
+            prepare = pop_instrumentation()
+            if self.user_attributes:
+                configure_users(user_classes, self.user_attributes(value), cluster)
+
+            users = self.users_for(value)
+            for run in todo:
+                print(f"  -> Run {run}/{self.runs} (Charge: {users} users)...", end=" ", flush=True)
+
+                try:
+                    result = run_locust(users, self.run_time, host=self.host,
+                                        user_classes=user_classes, cluster=cluster, warmup=self.warmup)
+                except Exception as e:
+                    # Non journalisé : le run sera refait à la reprise
+                    print(f" Erreur: {e}")
+                    time.sleep(self.pause)
+                    continue
+
+                if writes:
+                    invalidate_dataset()
+
+                timeseries.extend(point_rows(result['points'], result['steady_index'],
+                                             sweep=self.name, param=self.label(value), run=run))
+                timeseries_path = save_rows(timeseries, timeseries_path)
+                hist_path = os.path.join(hist_dir, f"{self.label(value)}_{run}.json")
+                result['histogram'].save(hist_path, sweep=self.name, param=value, run=run)
+                row = result_row(self.label(value), run, result, hist_path)
+                if self.columns:
+                    row.update(self.columns(value))
+                log.append(campaign, self.name, value, run, dataset, row, users=users,
+                           **({'prepare': prepare} if prepare else {}))
+                self.write_csv(log, campaign)
+
+                print(f" Result: avg {row['AVG_MS']}ms | p99 {row['P99_MS']}ms | "
+                      f"{row['RPS']} req/s | Failed: {row['FAILED']}")
+                if row.get('SRV_TIMED'):
+                    print(f"     Serveur (Server-Timing) : {describe(row)}")
+                if row['STEADY'] == 0:
+                    print(f"     ATTENTION: pas de régime stable détecté après {self.warmup}s de warm-up")
+                elif row['STEADY'] == '':
+                    print("     ATTENTION: run trop court pour vérifier le régime stable")
+                if row['CPU_SATURATED']:
+                    print(f"     ATTENTION: CPU du générateur de charge saturé ({row['CPU_MAX']}%), latences surestimées")
+
+                time.sleep(self.pause)
+
+        self.write_csv(log, campaign)
+        print(f"\nTerminé ! Résultats dans : {self.output}")
+        return self.output
@@ -0,0 +1,97 @@
+import argparse
+import json
+from collections import Counter
+
+# Histogramme de latences mergeable (même arrondi que locust : ~2 chiffres significatifs)
+
+PERCENTILES = [0.5, 0.9, 0.95, 0.99, 0.999]
+
+def bucket(ms):
+    if ms < 100:
+        return int(round(ms))
+    if ms < 1000:
+        return int(round(ms, -1))
+    if ms < 10000:
+        return int(round(ms, -2))
+    return int(round(ms, -3))
+
+def percentile_label(q):
+    return "P" + f"{q * 100:g}".replace(".", "")
+
+class Histogram:
+    def __init__(self, counts=None):
+        self.counts = Counter()
+        if counts:
+            for value, count in counts.items():
+                self.counts[int(value)] += int(count)
+
+    @classmethod
+    def from_locust(cls, entry):
+        # entry.response_times est déjà {ms arrondi: nombre}
+        return cls(entry.response_times)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)['buckets'])
+
+    def save(self, path, **meta):
+        with open(path, 'w') as f:
+            json.dump({**meta, 'count': self.total(), 'buckets': {str(k): v for k, v in sorted(self.counts.items())}}, f)
+
+    def record(self, ms, count=1):
+        self.counts[bucket(ms)] += count
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def max(self):
+        return max(self.counts) if self.counts else 0
+
+    def mean(self):
+        total = self.total()
+        return sum(v * c for v, c in self.counts.items()) / total if total else 0.0
+
+    def percentile(self, q):
+        total = self.total()
+        if not total:
+            return 0
+        target = q * total
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= target:
+                return value
+        return self.max()
+
+    def summary(self):
+        row = {f"{percentile_label(q)}_MS": self.percentile(q) for q in PERCENTILES}
+        row['MAX_MS'] = self.max()
+        return row
+
+def merge_files(paths):
+    merged = Histogram()
+    for path in paths:
+        merged.merge(Histogram.load(path))
+    return merged
+
+def main():
+    p = argparse.ArgumentParser(description="Fusionne des histogrammes de latence (runs, workers)")
+    p.add_argument('files', nargs='+')
+    p.add_argument('-o', '--output', help="Écrit l'histogramme fusionné")
+    args = p.parse_args()
+
+    merged = merge_files(args.files)
+    print(f"{len(args.files)} histogrammes, {merged.total()} requêtes")
+    for name, value in merged.summary().items():
+        print(f"  {name}: {value}")
+
+    if args.output:
+        merged.save(args.output, sources=args.files)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from histogram import Histogram
+
+# Instrumentation opt-in de seed.py / clean.py (--instrument out.json) :
+# - par phase : temps mur, CPU du process, CPU du thread principal (construction des entités en
+#   Python ; le reste du CPU est la sérialisation dans les threads du BulkWriter), entités/s ;
+#   quand des phases tournent en parallèle (clean --parallel-kinds), le CPU du process les compte
+#   toutes : own_cpu_s additionne alors le CPU de chaque thread travaillant pour la phase (worker()) ;
+# - par opération d'écriture : histogramme de latence de chaque batch (RPC Datastore) ;
+# - --profiler cprofile (thread principal) ou sample (échantillonnage des piles de tous les threads).
+
+PROFILERS = ['cprofile', 'sample']
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 15
+
+def add_instrument_args(parser):
+    parser.add_argument('--instrument', default=None, metavar='JSON',
+                        help="Écrit les mesures par phase (temps mur/CPU, latence des batchs, entités/s)")
+    parser.add_argument('--profiler', choices=PROFILERS, default=None,
+                        help="(avec --instrument) Profil cProfile (.prof) ou échantillonné (.folded)")
+
+class StackSampler:
+    # Profil échantillonné : piles de tous les threads toutes les `interval` s, format "folded"
+    # (une ligne par pile, lisible par flamegraph.pl / speedscope)
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, count=TOP_FUNCTIONS):
+        # Fonctions en sommet de pile (temps propre), en part des échantillons
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        total = sum(leaves.values())
+        return [{'function': name, 'share': round(n / total, 4)} for name, n in leaves.most_common(count)]
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+class Instrumentation:
+    def __init__(self, path=None, profiler=None, script=None):
+        self.enabled = path is not None
+        self.path = path
+        self.profiler = profiler if self.enabled else None
+        self.script = script
+        self.phases = {}
+        self.rpc = {}
+        self.worker_cpu = {}
+        self._lock = threading.Lock()
+        self._profile = None
+        self._sampler = None
+        self._start = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def start(self):
+        if self.profiler == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.profiler == 'sample':
+            self._sampler = StackSampler().start()
+        return self
+
+    @contextmanager
+    def phase(self, name):
+        # stats['entities'] est renseigné par l'appelant (entités écrites / supprimées)
+        stats = {'entities': 0}
+        if not self.enabled:
+            yield stats
+            return
+        wall, cpu, main_cpu = time.perf_counter(), time.process_time(), time.thread_time()
+        try:
+            yield stats
+        finally:
+            with self._lock:
+                entry = self.phases.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                      'main_cpu_s': 0.0, 'entities': 0})
+                entry['calls'] += 1
+                entry['wall_s'] += time.perf_counter() - wall
+                entry['cpu_s'] += time.process_time() - cpu
+                entry['main_cpu_s'] += time.thread_time() - main_cpu
+                entry['entities'] += stats['entities']
+
+    @contextmanager
+    def worker(self, phase):
+        # CPU du thread courant pendant le bloc, attribué à la phase (threads du BulkWriter, prefetch)
+        if not self.enabled:
+            yield
+            return
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.worker_cpu[phase] = self.worker_cpu.get(phase, 0.0) + time.thread_time() - cpu
+
+    def timed(self, op, label, phase=None):
+        # Enveloppe une opération de batch (put_multi, delete_multi...) : latence de chaque appel,
+        # et CPU du thread qui l'exécute si une phase est donnée
+        if not self.enabled:
+            return op
+
+        def call(batch):
+            start = time.perf_counter()
+            try:
+                if phase is None:
+                    return op(batch)
+                with self.worker(phase):
+                    return op(batch)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    entry = self.rpc.setdefault(label, {'histogram': Histogram(), 'items': 0})
+                    entry['histogram'].record(ms)
+                    entry['items'] += len(batch)
+        return call
+
+    def report(self):
+        phases = {}
+        for name, p in self.phases.items():
+            # Threads de la phase mesurés un par un : CPU propre à la phase, même si d'autres tournent en parallèle
+            own_cpu = p['main_cpu_s'] + self.worker_cpu[name] if name in self.worker_cpu else None
+            cpu = p['cpu_s'] if own_cpu is None else own_cpu
+            phases[name] = {
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in p.items()},
+                **({'own_cpu_s': round(own_cpu, 4)} if own_cpu is not None else {}),
+                'rate': round(p['entities'] / p['wall_s'], 1) if p['wall_s'] > 0 else 0.0,
+                # Part du temps mur passée hors CPU : attente des RPC / du réseau
+                'wait_share': round(max(p['wall_s'] - cpu, 0.0) / p['wall_s'], 4) if p['wall_s'] > 0 else 0.0,
+            }
+        rpc = {}
+        for label, entry in self.rpc.items():
+            histogram = entry['histogram']
+            rpc[label] = {'calls': histogram.total(), 'items': entry['items'], 'mean_ms': round(histogram.mean(), 2),
+                          **histogram.summary(), 'buckets': {str(k): v for k, v in sorted(histogram.counts.items())}}
+        return {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'time': time.time(),
+            'wall_s': round(time.perf_counter() - self._start, 4),
+            'cpu_s': round(time.process_time() - self._cpu, 4),
+            'phases': phases,
+            'rpc': rpc,
+        }
+
+    def finish(self, **extra):
+        if not self.enabled:
+            return None
+        report = {**self.report(), **extra}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        base = os.path.splitext(self.path)[0]
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(self._profile)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+            report['profile'] = {'kind': 'cprofile', 'path': f"{base}.prof", 'top': [
+                {'function': f"{func} ({os.path.basename(file)}:{line})", 'tottime_s': round(tt, 4), 'calls': nc}
+                for (file, line, func), (_, nc, tt, _, _) in top]}
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.save(f"{base}.folded")
+            report['profile'] = {'kind': 'sample', 'path': f"{base}.folded", 'samples': self._sampler.samples,
+                                 'interval_s': self._sampler.interval, 'top': self._sampler.top()}
+        with open(self.path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        return report
+
+def print_report(report):
+    print(f"\n[Instrumentation] {report['script']} : {report['wall_s']:.1f}s mur, {report['cpu_s']:.1f}s CPU")
+    for name, p in report['phases'].items():
+        own = f", propre {p['own_cpu_s']:.2f}s" if 'own_cpu_s' in p else ""
+        print(f"  {name:<16} {p['wall_s']:>8.2f}s mur | CPU {p['cpu_s']:.2f}s (principal {p['main_cpu_s']:.2f}s{own}) | "
+              f"attente {p['wait_share']:.0%} | {p['entities']} entités ({p['rate']:.0f}/s)")
+    for label, r in report['rpc'].items():
+        print(f"  RPC {label:<12} {r['calls']} batchs | moy {r['mean_ms']}ms | p50 {r['P50_MS']}ms | "
+              f"p99 {r['P99_MS']}ms | max {r['MAX_MS']}ms")
+    if 'profile' in report:
+        print(f"  Profil ({report['profile']['kind']}) : {report['profile']['path']}")
@@ -0,0 +1,267 @@
+import argparse
+import base64
+import heapq
+import itertools
+import json
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backend import add_backend_args, get_client, new_entity
+from servertiming import HEADER, ServerTiming
+
+# Implémentation de référence locale de /api/timeline :
+# - read (défaut) : fanout-on-read, User.follows -> derniers Post de chaque followee -> merge
+# - materialized : fanout-on-write, lecture de la Timeline précalculée par seed.py --materialize
+# Chaque réponse porte un en-tête Server-Timing (phases user/query/merge/serialize...).
+# Pagination : ?limit=N&cursor=... ; la réponse donne next_cursor (null sur la dernière page).
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+# Écritures max par transaction Datastore
+TRANSACTION_WRITES = 500
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Serveur local de référence pour /api/timeline")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8080)
+    p.add_argument('--fanout-on-write', type=int, default=0, metavar='N',
+                   help="Met à jour les Timeline des followers (N posts max) à chaque post")
+    add_backend_args(p)
+    return p.parse_args()
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode()
+
+def decode_cursor(cursor):
+    # ValueError si le curseur est illisible
+    if not cursor:
+        return None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {e}")
+    if not isinstance(state, dict):
+        raise ValueError("invalid cursor")
+    return state
+
+def posts_by_author(client, author, limit, before=None):
+    query = client.query(kind='Post')
+    query.add_filter('author', '=', author)
+    if before is not None:
+        query.add_filter('created', '<=', before)
+    query.order = ['-created']
+    return list(query.fetch(limit=limit))
+
+def fanout_on_read(client, user, limit=DEFAULT_LIMIT, timing=None, cursor=None):
+    # Keyset sur (created, id) : chaque page relit au plus limit posts par followee à partir de la
+    # date du dernier post servi ; les posts de même date déjà servis sont dans le curseur.
+    timing = timing or ServerTiming()
+    with timing.phase('user'):
+        entity = client.get(client.key('User', user))
+    if entity is None:
+        return None, None
+
+    before, seen = None, set()
+    if cursor:
+        before = datetime.fromisoformat(cursor['t'])
+        seen = set(cursor.get('ids') or [])
+    with timing.phase('query'):
+        streams = [[post for post in posts_by_author(client, followee, limit + len(seen), before)
+                    if post.key.id_or_name not in seen]
+                   for followee in entity.get('follows') or []]
+    with timing.phase('merge'):
+        merged = heapq.merge(*streams, key=lambda post: post['created'], reverse=True)
+        posts = list(itertools.islice(merged, limit))
+
+    if len(posts) < limit:
+        return posts, None
+    last = posts[-1]['created']
+    ids = [post.key.id_or_name for post in posts if post['created'] == last]
+    if last == before:
+        ids += sorted(seen)
+    return posts, encode_cursor({'t': last.isoformat(), 'ids': ids})
+
+def materialized_read(client, user, limit=DEFAULT_LIMIT, timing=None, cursor=None):
+    timing = timing or ServerTiming()
+    with timing.phase('timeline'):
+        timeline = client.get(client.key('Timeline', user))
+    if timeline is None:
+        return None, None
+
+    start = int(cursor['o']) if cursor else 0
+    all_keys = list(timeline.get('posts') or [])
+    keys = all_keys[start:start + limit]
+    with timing.phase('posts'):
+        by_key = {post.key: post for post in client.get_multi(keys)}
+    posts = [by_key[key] for key in keys if key in by_key]
+    more = start + limit < len(all_keys)
+    return posts, encode_cursor({'o': start + limit}) if more else None
+
+STRATEGIES = {
+    'read': fanout_on_read,
+    'materialized': materialized_read,
+}
+
+def create_post(client, author, content, timeline_size=0, timing=None):
+    timing = timing or ServerTiming()
+    with timing.phase('user'):
+        if client.get(client.key('User', author)) is None:
+            return None
+
+    post = new_entity(client.key('Post'))
+    post['author'] = author
+    post['content'] = content
+    post['created'] = datetime.utcnow()
+    with timing.phase('put'):
+        client.put(post)
+
+    if not timeline_size:
+        return post
+    with timing.phase('fanout'):
+        # Fanout-on-write : insertion en tête de la timeline de chaque follower
+        query = client.query(kind='User')
+        query.add_filter('follows', '=', author)
+        query.keys_only()
+        followers = [entity.key.name for entity in query.fetch()]
+        # Lecture-modification-écriture en transaction : deux posts simultanés ne s'écrasent pas
+        for start in range(0, len(followers), TRANSACTION_WRITES):
+            keys = [client.key('Timeline', name) for name in followers[start:start + TRANSACTION_WRITES]]
+            with client.transaction():
+                timelines = client.get_multi(keys)
+                for timeline in timelines:
+                    timeline['posts'] = [post.key] + list(timeline.get('posts') or [])[:timeline_size - 1]
+                    timeline['updated'] = post['created']
+                if timelines:
+                    client.put_multi(timelines)
+    return post
+
+def follow(client, user, target, timing=None):
+    timing = timing or ServerTiming()
+    with timing.phase('user'):
+        entity = client.get(client.key('User', user))
+        if entity is None or client.get(client.key('User', target)) is None:
+            return None
+
+    follows = set(entity.get('follows') or [])
+    if target not in follows and target != user:
+        follows.add(target)
+        entity['follows'] = sorted(follows)
+        with timing.phase('put'):
+            client.put(entity)
+    return entity
+
+def serialize_post(post):
+    return {
+        'id': post.key.id_or_name,
+        'author': post.get('author'),
+        'content': post.get('content'),
+        'created': post['created'].isoformat() if post.get('created') else None,
+    }
+
+class TimelineHandler(BaseHTTPRequestHandler):
+    client = None
+    timeline_size = 0
+
+    def send_json(self, status, payload, timing=None):
+        timing = timing or ServerTiming()
+        with timing.phase('serialize'):
+            body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header(HEADER, timing.header())
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        timing = ServerTiming()
+        url = urlparse(self.path)
+        if url.path != '/api/timeline':
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        params = parse_qs(url.query)
+        user = params.get('user', [None])[0]
+        if not user:
+            self.send_json(400, {'error': 'missing user'})
+            return
+        try:
+            limit = int(params.get('limit', [DEFAULT_LIMIT])[0])
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= MAX_LIMIT:
+            self.send_json(400, {'error': f'invalid limit (1..{MAX_LIMIT})'})
+            return
+        try:
+            cursor = decode_cursor(params.get('cursor', [None])[0])
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        strategy = STRATEGIES.get(params.get('mode', ['read'])[0])
+        if strategy is None:
+            self.send_json(400, {'error': 'invalid mode'})
+            return
+
+        try:
+            posts, next_cursor = strategy(self.client, user, limit, timing, cursor)
+        except (KeyError, TypeError, ValueError):
+            self.send_json(400, {'error': 'invalid cursor'}, timing)
+            return
+        if posts is None:
+            self.send_json(404, {'error': f'unknown user {user}'}, timing)
+            return
+        self.send_json(200, {'user': user, 'timeline': [serialize_post(p) for p in posts],
+                             'next_cursor': next_cursor}, timing)
+
+    def do_POST(self):
+        timing = ServerTiming()
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {'error': 'invalid json'})
+            return
+
+        if url.path == '/api/post':
+            if not body.get('user'):
+                self.send_json(400, {'error': 'missing user'})
+                return
+            post = create_post(self.client, body['user'], body.get('content', ''), self.timeline_size, timing)
+            if post is None:
+                self.send_json(404, {'error': f"unknown user {body['user']}"}, timing)
+                return
+            self.send_json(201, serialize_post(post), timing)
+        elif url.path == '/api/follow':
+            if not body.get('user') or not body.get('target'):
+                self.send_json(400, {'error': 'missing user or target'})
+                return
+            entity = follow(self.client, body['user'], body['target'], timing)
+            if entity is None:
+                self.send_json(404, {'error': 'unknown user'}, timing)
+                return
+            self.send_json(200, {'user': body['user'], 'follows': entity['follows']}, timing)
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host, port, backend=None, timeline_size=0):
+    TimelineHandler.client = get_client(backend)
+    TimelineHandler.timeline_size = timeline_size
+    server = ThreadingHTTPServer((host, port), TimelineHandler)
+    server.daemon_threads = True
+    print(f"[Serveur] /api/timeline sur http://{host}:{port} (backend: {backend or 'défaut'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.host, args.port, args.backend, args.fanout_on_write)
@@ -0,0 +1,333 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Stand-in local du Datastore (sqlite) : même surface que google.cloud.datastore
+# pour ce que les scripts utilisent (put_multi, delete_multi, get, requêtes keys-only,
+# filtres/ordres simples, curseurs, count, transactions).
+
+DT_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entities (
+        kind TEXT NOT NULL,
+        ref TEXT NOT NULL,
+        props TEXT NOT NULL,
+        meta TEXT NOT NULL,
+        PRIMARY KEY (kind, ref)
+    ) WITHOUT ROWID""",
+    """CREATE INDEX IF NOT EXISTS entities_author_created
+        ON entities (kind, json_extract(props, '$."author"'), json_extract(props, '$."created"'))""",
+    """CREATE TABLE IF NOT EXISTS counters (kind TEXT PRIMARY KEY, next INTEGER NOT NULL)""",
+    # Index des propriétés multi-valuées (comme le Datastore : filtre '=' sur un élément de la liste)
+    """CREATE TABLE IF NOT EXISTS list_values (
+        kind TEXT NOT NULL,
+        prop TEXT NOT NULL,
+        value NOT NULL,
+        ref TEXT NOT NULL,
+        PRIMARY KEY (kind, prop, value, ref)
+    ) WITHOUT ROWID""",
+    """CREATE INDEX IF NOT EXISTS list_values_ref ON list_values (kind, ref)""",
+]
+
+OPERATORS = {'=', '<', '<=', '>', '>=', '!='}
+
+class Key:
+    def __init__(self, kind, id_or_name=None):
+        self.kind = kind
+        self.name = id_or_name if isinstance(id_or_name, str) else None
+        self.id = id_or_name if isinstance(id_or_name, int) else None
+
+    @property
+    def id_or_name(self):
+        return self.name if self.name is not None else self.id
+
+    @property
+    def is_partial(self):
+        return self.id_or_name is None
+
+    def completed_key(self, id_):
+        return Key(self.kind, id_)
+
+    def ref(self):
+        return f"n:{self.name}" if self.name is not None else f"i:{self.id:020d}"
+
+    @classmethod
+    def from_ref(cls, kind, ref):
+        value = ref[2:]
+        return cls(kind, value if ref.startswith("n:") else int(value))
+
+    def __eq__(self, other):
+        return isinstance(other, Key) and (self.kind, self.id_or_name) == (other.kind, other.id_or_name)
+
+    def __hash__(self):
+        return hash((self.kind, self.id_or_name))
+
+    def __repr__(self):
+        return f"<Key {self.kind}:{self.id_or_name}>"
+
+class Entity(dict):
+    def __init__(self, key=None, exclude_from_indexes=()):
+        super().__init__()
+        self.key = key
+        self.exclude_from_indexes = set(exclude_from_indexes)
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime(DT_FORMAT), "dt"
+    if isinstance(value, Key):
+        return [value.kind, value.id_or_name], "key"
+    if isinstance(value, list) and value and isinstance(value[0], (datetime, Key)):
+        encoded = [encode_value(v) for v in value]
+        return [v for v, _ in encoded], encoded[0][1] + "[]"
+    return value, None
+
+def decode_value(value, kind):
+    if kind == "dt":
+        return datetime.strptime(value, DT_FORMAT)
+    if kind == "key":
+        return Key(*value)
+    if kind and kind.endswith("[]"):
+        return [decode_value(v, kind[:-2]) for v in value]
+    return value
+
+def encode_entity(entity):
+    props, meta = {}, {}
+    for name, value in entity.items():
+        props[name], kind = encode_value(value)
+        if kind:
+            meta[name] = kind
+    return json.dumps(props), json.dumps(meta)
+
+def list_rows(entity):
+    ref = entity.key.ref()
+    rows = []
+    for name, value in entity.items():
+        if isinstance(value, list) and name not in entity.exclude_from_indexes:
+            encoded = encode_value(value)[0]
+            for item in set(json.dumps(v) if isinstance(v, list) else v for v in encoded):
+                rows.append((entity.key.kind, name, item, ref))
+    return rows
+
+def decode_entity(kind, ref, props, meta):
+    entity = Entity(Key.from_ref(kind, ref))
+    meta = json.loads(meta)
+    for name, value in json.loads(props).items():
+        entity[name] = decode_value(value, meta.get(name))
+    return entity
+
+def prop_expr(name):
+    return f"json_extract(props, '$.\"{name}\"')"
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+class AggregationQuery:
+    def __init__(self, query):
+        self.query = query
+        self.alias = None
+
+    def count(self, alias=None):
+        self.alias = alias
+        return self
+
+    def fetch(self):
+        sql, params = self.query.sql(count=True)
+        value = self.query.client.conn().execute(sql, params).fetchone()[0]
+        return [[AggregationResult(self.alias, value)]]
+
+class QueryIterator:
+    PAGE = 1000
+
+    def __init__(self, query, limit=None, start_cursor=None):
+        self.query = query
+        self.limit = limit
+        self.start_cursor = start_cursor.decode() if isinstance(start_cursor, bytes) else start_cursor
+        self.next_page_token = None
+
+    def __iter__(self):
+        sql, params = self.query.sql(limit=self.limit, cursor=self.start_cursor)
+        offset = int(self.start_cursor[2:]) if self.start_cursor and self.start_cursor.startswith("o:") else 0
+        rows = self.query.client.conn().execute(sql, params)
+        count, last_ref = 0, None
+        while True:
+            chunk = rows.fetchmany(self.PAGE)
+            if not chunk:
+                break
+            for ref, props, meta in chunk:
+                count += 1
+                last_ref = ref
+                if self.query.projection_keys:
+                    yield Entity(Key.from_ref(self.query.kind, ref))
+                else:
+                    yield decode_entity(self.query.kind, ref, props, meta)
+
+        if self.limit is not None and count >= self.limit:
+            self.next_page_token = f"o:{offset + count}" if self.query.order else f"k:{last_ref}"
+
+    @property
+    def pages(self):
+        yield list(self)
+
+class Query:
+    def __init__(self, client, kind):
+        self.client = client
+        self.kind = kind
+        self.filters = []
+        self.order = []
+        self.projection_keys = False
+
+    def keys_only(self):
+        self.projection_keys = True
+
+    def add_filter(self, property_name, operator, value):
+        if operator not in OPERATORS:
+            raise ValueError(f"Opérateur non supporté: {operator}")
+        self.filters.append((property_name, operator, encode_value(value)[0]))
+        return self
+
+    def fetch(self, limit=None, start_cursor=None):
+        return QueryIterator(self, limit, start_cursor)
+
+    def sql(self, limit=None, cursor=None, count=False):
+        where, params = ["kind = ?"], [self.kind]
+        for name, operator, value in self.filters:
+            if operator == '=' and self.client.is_list_property(self.kind, name):
+                where.append("ref IN (SELECT ref FROM list_values WHERE kind = ? AND prop = ? AND value = ?)")
+                params.extend([self.kind, name, value])
+                continue
+            where.append(f"{prop_expr(name)} {operator} ?")
+            params.append(value)
+        if cursor and cursor.startswith("k:"):
+            where.append("ref > ?")
+            params.append(cursor[2:])
+
+        columns = "COUNT(*)" if count else ("ref, NULL, NULL" if self.projection_keys else "ref, props, meta")
+        sql = f"SELECT {columns} FROM entities WHERE {' AND '.join(where)}"
+        if count:
+            return sql, params
+
+        orders = [f"{prop_expr(o.lstrip('-'))} {'DESC' if o.startswith('-') else 'ASC'}" for o in self.order]
+        sql += f" ORDER BY {', '.join(orders + ['ref'])}"
+        sql += f" LIMIT {-1 if limit is None else int(limit)}"
+        if cursor and cursor.startswith("o:"):
+            sql += f" OFFSET {int(cursor[2:])}"
+        return sql, params
+
+class LocalClient:
+    def __init__(self, path, project="local"):
+        self.path = path
+        self.project = project
+        self._local = threading.local()
+        with self.conn() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_list_property(self, kind, name):
+        row = self.conn().execute("SELECT 1 FROM list_values WHERE kind = ? AND prop = ? LIMIT 1",
+                                  (kind, name)).fetchone()
+        return row is not None
+
+    def key(self, kind, id_or_name=None):
+        return Key(kind, id_or_name)
+
+    def query(self, kind):
+        return Query(self, kind)
+
+    def aggregation_query(self, query):
+        return AggregationQuery(query)
+
+    @contextmanager
+    def _write(self, begin="BEGIN"):
+        # Transaction sqlite annulée sur exception ; dans client.transaction(), les écritures
+        # rejoignent la transaction en cours
+        conn = self.conn()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute(begin)
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def transaction(self):
+        # Comme client.transaction() du Datastore : lectures et écritures du bloc validées ensemble
+        # (verrou d'écriture pris dès le début : pas de lecture-modification-écriture concurrente)
+        return self._write("BEGIN IMMEDIATE")
+
+    def allocate_ids(self, incomplete_key, num_ids):
+        with self._write("BEGIN IMMEDIATE") as conn:
+            row = conn.execute("SELECT next FROM counters WHERE kind = ?", (incomplete_key.kind,)).fetchone()
+            start = row[0] if row else 1
+            conn.execute("INSERT OR REPLACE INTO counters (kind, next) VALUES (?, ?)",
+                         (incomplete_key.kind, start + num_ids))
+        return [incomplete_key.completed_key(i) for i in range(start, start + num_ids)]
+
+    def reserve_ids_multi(self, complete_keys):
+        # IDs écrits explicitement (import de snapshot) : allocate_ids ne doit plus les rendre
+        top = {}
+        for key in complete_keys:
+            if key.id is not None:
+                top[key.kind] = max(top.get(key.kind, 0), key.id)
+        with self._write("BEGIN IMMEDIATE") as conn:
+            for kind, id_ in top.items():
+                conn.execute("INSERT INTO counters (kind, next) VALUES (?, ?) "
+                             "ON CONFLICT (kind) DO UPDATE SET next = MAX(next, excluded.next)", (kind, id_ + 1))
+
+    def put_multi(self, entities):
+        entities = list(entities)
+        for kind in {e.key.kind for e in entities if e.key.is_partial}:
+            partial = [e for e in entities if e.key.is_partial and e.key.kind == kind]
+            for entity, key in zip(partial, self.allocate_ids(partial[0].key, len(partial))):
+                entity.key = key
+
+        rows = [(e.key.kind, e.key.ref(), *encode_entity(e)) for e in entities]
+        values = [row for e in entities for row in list_rows(e)]
+        with self._write() as conn:
+            conn.executemany("DELETE FROM list_values WHERE kind = ? AND ref = ?", [row[:2] for row in rows])
+            conn.executemany("INSERT OR REPLACE INTO entities (kind, ref, props, meta) VALUES (?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR IGNORE INTO list_values (kind, prop, value, ref) VALUES (?, ?, ?, ?)", values)
+
+    def put(self, entity):
+        self.put_multi([entity])
+
+    def delete_multi(self, keys):
+        refs = [(k.kind, k.ref()) for k in keys]
+        with self._write() as conn:
+            conn.executemany("DELETE FROM entities WHERE kind = ? AND ref = ?", refs)
+            conn.executemany("DELETE FROM list_values WHERE kind = ? AND ref = ?", refs)
+
+    def delete(self, key):
+        self.delete_multi([key])
+
+    def get_multi(self, keys):
+        conn = self.conn()
+        found = []
+        for key in keys:
+            row = conn.execute("SELECT props, meta FROM entities WHERE kind = ? AND ref = ?",
+                               (key.kind, key.ref())).fetchone()
+            if row is not None:
+                found.append(decode_entity(key.kind, key.ref(), *row))
+        return found
+
+    def get(self, key):
+        found = self.get_multi([key])
+        return found[0] if found else None
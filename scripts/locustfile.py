@@ -1,11 +1,101 @@
+import itertools
+import json
+import os
 import random
-from locust import HttpUser, task, between
+from locust import HttpUser, between, events
+
+from backend import DATASET_FILE
+from servertiming import TimingCollector
+
+# Modèle de charge : tâches pondérées lecture/post/follow, users "chauds" tirés selon une loi de Zipf,
+# plage d'utilisateurs lue dans le manifeste écrit par seed.py.
+# Profil choisi par LOCUST_PROFILE (défaut: uniform-read, le comportement historique).
+
+PROFILES = {
+    # Lecture seule, users uniformes : comparable aux anciens résultats
+    'uniform-read': {'timeline': 1, 'post': 0, 'follow': 0, 'zipf': 0.0, 'celebrity_posts': False},
+    'read-heavy': {'timeline': 95, 'post': 4, 'follow': 1, 'zipf': 1.0, 'celebrity_posts': False},
+    'write-burst': {'timeline': 40, 'post': 55, 'follow': 5, 'zipf': 0.8, 'celebrity_posts': False},
+    # Les comptes les plus suivis publient : pire cas pour le fanout-on-write
+    'celebrity-post': {'timeline': 80, 'post': 20, 'follow': 0, 'zipf': 1.1, 'celebrity_posts': True},
+}
+
+PROFILE_NAME = os.environ.get("LOCUST_PROFILE", "uniform-read")
+PROFILE = PROFILES[PROFILE_NAME]
+
+def load_dataset():
+    try:
+        with open(DATASET_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'users': 1000, 'prefix': 'user', 'hot_users': []}
+
+class Dataset:
+    # Vue du manifeste, relue quand seed.py l'a réécrit : le harness (et ses workers) importe ce
+    # fichier une fois par sweep, avant le ensure_dataset de chaque étape
+    def __init__(self, path=DATASET_FILE):
+        self.path = path
+        self.mtime = -1
+        self.refresh()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return self
+        manifest = load_dataset()
+        self.mtime = mtime
+        self.total_users = manifest['users']
+        self.prefix = manifest.get('prefix', 'user')
+        self.hot_users = manifest.get('hot_users') or [f"{self.prefix}{i}" for i in range(1, min(10, self.total_users) + 1)]
+        # user{rang} : user1 est le plus demandé
+        self.cum_weights = list(itertools.accumulate(r ** -PROFILE['zipf'] for r in range(1, self.total_users + 1)))
+        return self
+
+DATASET = Dataset()
+
+def pick_user():
+    if not PROFILE['zipf']:
+        return f"{DATASET.prefix}{random.randint(1, DATASET.total_users)}"
+    rank = random.choices(range(1, DATASET.total_users + 1), cum_weights=DATASET.cum_weights)[0]
+    return f"{DATASET.prefix}{rank}"
+
+def get_timeline(user):
+    username = pick_user()
+    mode = user.timeline_mode
+    query = f"user={username}" + (f"&mode={mode}" if mode else "")
+    user.client.get(f"/api/timeline?{query}", name="/api/timeline?user=[id]")
+
+def create_post(user):
+    author = random.choice(DATASET.hot_users) if PROFILE['celebrity_posts'] else pick_user()
+    user.client.post("/api/post", json={'user': author, 'content': f"Locust post by {author}"}, name="/api/post")
+
+def follow_user(user):
+    follower = pick_user()
+    target = pick_user()
+    if target != follower:
+        user.client.post("/api/follow", json={'user': follower, 'target': target}, name="/api/follow")
 
 class TinyInstaUser(HttpUser):
     wait_time = between(0.5, 1.0)
+    # materialized pour lire les timelines précalculées (fanout-on-write) ; fixé par palier par le
+    # harness (Sweep user_attributes), TIMELINE_MODE en lancement direct
+    timeline_mode = os.environ.get("TIMELINE_MODE")
+    # Le profil modifie le dataset : le harness devra le resynchroniser
+    writes = bool(PROFILE['post'] or PROFILE['follow'])
+    tasks = {
+        task_fn: PROFILE[name]
+        for name, task_fn in [('timeline', get_timeline), ('post', create_post), ('follow', follow_user)]
+        if PROFILE[name]
+    }
+
+    def on_start(self):
+        DATASET.refresh()
 
-    @task
-    def get_timeline(self):
-        user_id = random.randint(1, 1000)
-        username = f"user{user_id}"
-        self.client.get(f"/api/timeline?user={username}", name="/api/timeline?user=[id]")
+@events.init.add_listener
+def on_init(environment, **kwargs):
+    # Workers lancés par "locust --worker" : remontent les en-têtes Server-Timing au master
+    if type(environment.runner).__name__ == 'WorkerRunner':
+        TimingCollector(environment.events)
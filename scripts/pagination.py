@@ -0,0 +1,245 @@
+import argparse
+import csv
+import os
+import re
+import time
+from urllib.parse import urlencode
+
+from locust import HttpUser, between, task
+
+from harness import OUT_DIR, add_sweep_args, dataset_spec, ensure_dataset, pop_instrumentation, run_locust
+from histogram import Histogram
+from locustfile import DATASET, pick_user
+from report import best_fit, fit_models, growth
+from results import ResultsLog, fingerprint
+from timeseries import WARMUP_S
+
+# Benchmark de pagination de /api/timeline : chaque user locust fait défiler la timeline d'un
+# utilisateur page par page en suivant next_cursor, jusqu'à --depth pages. Latence mesurée par
+# index de page et par taille de page, puis ajustée pour voir si les pages profondes se dégradent.
+
+# PARAMS
+PAGE_SIZES = [10, 20, 50, 100]
+DEPTH = 10
+LOCUST_USERS = 20
+DB_TOTAL_USERS = 1000
+POSTS_PER_USER = 100
+FOLLOWERS_COUNT = 50
+RUNS_PER_STEP = 2
+RUN_TIME = 30
+
+SWEEP_NAME = 'pagination'
+OUTPUT = os.path.join(OUT_DIR, 'pagination.csv')
+SUMMARY_OUTPUT = os.path.join(OUT_DIR, 'pagination_summary.csv')
+PLOT_OUTPUT = os.path.join(OUT_DIR, 'pagination.png')
+
+PAGE_NAME = "/api/timeline?user=[id]&cursor=[page {}]"
+PAGE_PATTERN = re.compile(r"\[page (\d+)\]")
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark de pagination de /api/timeline (latence par page)")
+    p.add_argument('--limits', type=int, nargs='+', default=PAGE_SIZES, help="Tailles de page testées")
+    p.add_argument('--depth', type=int, default=DEPTH, help="Pages lues au plus par défilement")
+    p.add_argument('--users', type=int, default=LOCUST_USERS)
+    p.add_argument('--runs', type=int, default=RUNS_PER_STEP)
+    p.add_argument('--run-time', type=int, default=RUN_TIME)
+    p.add_argument('--warmup', type=float, default=WARMUP_S)
+    add_sweep_args(p)
+    return p.parse_args()
+
+class TimelineScroller(HttpUser):
+    # Configuré par scroller() : taille et profondeur de page
+    abstract = True
+    wait_time = between(0.5, 1.0)
+    limit = 20
+    depth = DEPTH
+    timeline_mode = os.environ.get("TIMELINE_MODE")
+
+    def on_start(self):
+        DATASET.refresh()
+
+    @task
+    def scroll(self):
+        params = {'user': pick_user(), 'limit': self.limit}
+        if self.timeline_mode:
+            params['mode'] = self.timeline_mode
+        for page in range(1, self.depth + 1):
+            with self.client.get(f"/api/timeline?{urlencode(params)}", name=PAGE_NAME.format(page),
+                                 catch_response=True) as response:
+                try:
+                    cursor = response.json().get('next_cursor') if response.ok else None
+                except ValueError:
+                    response.failure("réponse non JSON")
+                    return
+            if not cursor:
+                return
+            params['cursor'] = cursor
+            self.wait()
+
+def scroller(limit, depth):
+    return type(f"TimelineScroller{limit}", (TimelineScroller,), {'abstract': False, 'limit': limit, 'depth': depth})
+
+class PageCollector:
+    # Listener locust : histogramme par index de page, après le warm-up
+    def __init__(self, warmup=WARMUP_S):
+        self.warmup = warmup
+        self.start = None
+        self.histograms = {}
+        self.failures = {}
+        self.bytes = {}
+
+    def attach(self, events):
+        self.start = time.monotonic()
+        events.request.add_listener(self.on_request)
+
+    def on_request(self, name=None, response_time=None, response_length=0, exception=None, **kwargs):
+        match = PAGE_PATTERN.search(name or '')
+        if match is None or time.monotonic() - self.start < self.warmup:
+            return
+        page = int(match.group(1))
+        self.histograms.setdefault(page, Histogram()).record(response_time or 0)
+        self.bytes[page] = self.bytes.get(page, 0) + (response_length or 0)
+        if exception is not None:
+            self.failures[page] = self.failures.get(page, 0) + 1
+
+    def rows(self, limit, run):
+        rows = []
+        first = self.histograms.get(1, Histogram()).total()
+        for page in sorted(self.histograms):
+            histogram = self.histograms[page]
+            n = histogram.total()
+            rows.append({
+                'LIMIT': limit,
+                'PAGE': page,
+                'RUN': run,
+                'REQUESTS': n,
+                # Part des défilements qui atteignent cette page (timelines plus courtes que depth)
+                'REACHED': round(n / first, 4) if first else 0.0,
+                'AVG_MS': round(histogram.mean(), 1),
+                **histogram.summary(),
+                'FAIL_RATIO': round(self.failures.get(page, 0) / n, 4) if n else 0.0,
+                'BYTES_AVG': round(self.bytes[page] / n) if n else 0,
+            })
+        return rows
+
+def page_rows(entries):
+    # Pages des runs complets : le marqueur d'un run suit ses PAGES lignes, écrites d'un bloc (un run
+    # refait après un arrêt brutal remplace les pages précédentes)
+    runs = {}
+    for i, entry in enumerate(entries):
+        if 'page' not in entry['param']:
+            pages = entry['row']['PAGES']
+            runs[(entry['param']['limit'], entry['run'], entry['dataset'])] = [e['row'] for e in entries[i - pages:i]]
+    return sorted((row for rows in runs.values() for row in rows), key=lambda r: (r['LIMIT'], r['PAGE'], r['RUN']))
+
+def write_csv(rows, path, fields=None):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields or list(rows[0]), restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def summarize(rows):
+    # Par taille de page : latence moyenne par index de page (moyenne des runs) et ajustement
+    by_limit = {}
+    for row in rows:
+        by_limit.setdefault(row['LIMIT'], {}).setdefault(row['PAGE'], []).append(row)
+
+    summary = []
+    for limit in sorted(by_limit):
+        pages = sorted(by_limit[limit])
+        avg = [sum(r['AVG_MS'] for r in by_limit[limit][p]) / len(by_limit[limit][p]) for p in pages]
+        p99 = [max(r['P99_MS'] for r in by_limit[limit][p]) for p in pages]
+        entry = {'LIMIT': limit, 'PAGES': len(pages), 'FIRST_MS': round(avg[0], 1), 'LAST_MS': round(avg[-1], 1),
+                 'DEEP_RATIO': round(avg[-1] / avg[0], 2) if avg[0] else None, 'P99_LAST_MS': p99[-1],
+                 'MS_PER_ITEM': round(avg[0] / limit, 3), 'MODEL': '', 'FORMULA': '', 'R2': None, 'GROWTH': ''}
+        if len(pages) >= 3:
+            fit = best_fit(fit_models(pages, avg))
+            entry.update(MODEL=fit['model'], FORMULA=fit['formula'], R2=round(fit['r2'], 3), GROWTH=growth(fit))
+        entry['curve'] = (pages, avg, p99)
+        summary.append(entry)
+    return summary
+
+def plot(summary, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(10, 6.5))
+    for entry in summary:
+        pages, avg, p99 = entry['curve']
+        line, = ax.plot(pages, avg, 'o-', linewidth=2, label=f"limit={entry['LIMIT']} (moyenne)")
+        ax.plot(pages, p99, ':', color=line.get_color(), label=f"limit={entry['LIMIT']} (p99)")
+    ax.set_xlabel("Index de page (suivi de next_cursor)")
+    ax.set_ylabel("Temps de réponse (ms)")
+    ax.set_ylim(bottom=0)
+    ax.set_title("Latence par page de timeline", fontsize=16, pad=15)
+    ax.legend(loc='upper left', frameon=True)
+    fig.tight_layout()
+    fig.savefig(path, dpi=200)
+    plt.close(fig)
+    return path
+
+def main():
+    args = parse_args()
+    spec = dataset_spec(DB_TOTAL_USERS, DB_TOTAL_USERS * POSTS_PER_USER, FOLLOWERS_COUNT)
+    dataset = fingerprint(spec)
+    log = ResultsLog()
+    hist_dir = os.path.join(OUT_DIR, 'hist', args.campaign, SWEEP_NAME)
+    os.makedirs(hist_dir, exist_ok=True)
+
+    print(f"--- PAGINATION : limits {args.limits}, {args.depth} pages max, {args.users} users "
+          f"(campagne: {args.campaign}) ---")
+    for limit in args.limits:
+        todo = [run for run in range(1, args.runs + 1)
+                if not log.done(args.campaign, SWEEP_NAME, {'limit': limit}, run, dataset)]
+        if not todo:
+            print(f"  limit={limit} : déjà mesuré dans cette campagne, sauté.")
+            continue
+        pop_instrumentation()
+        ensure_dataset(spec)
+        prepare = pop_instrumentation()
+        for run in todo:
+            print(f"  -> limit={limit}, run {run}/{args.runs}...", end=" ", flush=True)
+            collector = PageCollector(args.warmup)
+            try:
+                run_locust(args.users, args.run_time, user_classes=[scroller(limit, args.depth)],
+                           warmup=args.warmup, listeners=[collector.attach])
+            except Exception as e:
+                print(f" Erreur: {e}")
+                continue
+            rows = collector.rows(limit, run)
+            extra = {'users': args.users, **({'prepare': prepare} if prepare else {})}
+            entries = []
+            for row in rows:
+                hist_path = os.path.join(hist_dir, f"l{limit}-p{row['PAGE']}_{run}.json")
+                collector.histograms[row['PAGE']].save(hist_path, limit=limit, page=row['PAGE'], run=run)
+                row['HIST'] = os.path.relpath(hist_path, OUT_DIR)
+                entries.append(log.entry(args.campaign, SWEEP_NAME, {'limit': limit, 'page': row['PAGE']}, run,
+                                         dataset, row, **extra))
+            # Marqueur de fin du run, écrit avec ses pages : la reprise ne saute que les runs complets
+            entries.append(log.entry(args.campaign, SWEEP_NAME, {'limit': limit}, run, dataset,
+                                     {'LIMIT': limit, 'RUN': run, 'PAGES': len(rows)}, **extra))
+            log.append_many(entries)
+            print(" | ".join(f"p{r['PAGE']} {r['AVG_MS']}ms" for r in rows) or "aucune page mesurée")
+
+    rows = page_rows(log.select(args.campaign, SWEEP_NAME))
+    if not rows:
+        print("Aucun résultat.")
+        return 2
+    write_csv(rows, OUTPUT)
+
+    summary = summarize(rows)
+    print("\n--- LATENCE PAR PAGE ---")
+    for entry in summary:
+        trend = f"{entry['MODEL']} {entry['FORMULA']} (R² {entry['R2']}), {entry['GROWTH']}" if entry['MODEL'] else "-"
+        print(f"  limit={entry['LIMIT']:<4} page 1 {entry['FIRST_MS']}ms -> page {entry['PAGES']} "
+              f"{entry['LAST_MS']}ms (x{entry['DEEP_RATIO']}, p99 {entry['P99_LAST_MS']}ms) | {trend}")
+    write_csv([{k: v for k, v in e.items() if k != 'curve'} for e in summary], SUMMARY_OUTPUT)
+    print(f"\nRésultats dans : {OUTPUT}, {SUMMARY_OUTPUT}")
+    print(f"Graphique : {plot(summary, PLOT_OUTPUT)}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,368 @@
+import argparse
+import csv
+import html
+import os
+from datetime import datetime
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from servertiming import NETWORK, TOTAL, column, phase_columns
+
+# Graphiques et rapport (Markdown + HTML) à partir des CSV des sweeps (out/<sweep>.csv) :
+# latence par palier (moyenne ± écart-type, bande p50-p99), débit et taux d'erreur superposés,
+# ajustement de la latence moyenne en linéaire / log / loi de puissance, et décomposition
+# empilée du temps par phase quand le serveur renvoie des en-têtes Server-Timing.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'out')
+
+SWEEPS = {
+    'conc': ("Impact de la charge (Concurrence)", "Nombre d'utilisateurs simultanés"),
+    'post': ("Impact du nombre de posts", "Posts par utilisateur"),
+    'fanout': ("Impact du fanout (followees)", "Followees par utilisateur"),
+    'strategy': ("Fanout-on-read vs fanout-on-write", "Followees par utilisateur"),
+    'grid': ("Concurrence × posts × followees", "Nombre d'utilisateurs simultanés"),
+}
+
+# Sweeps dont PARAM est un libellé (paliers multi-dimensionnels) : une courbe par combinaison des
+# colonnes de regroupement, en fonction de la colonne numérique x
+GROUPED = {
+    'strategy': ('FOLLOWS', ['MODE', 'POSTS_PER_USER']),
+    'grid': ('USERS', ['POSTS_PER_USER', 'FOLLOWS']),
+}
+
+# Écart de R² en dessous duquel on préfère le modèle le plus simple
+FIT_TOLERANCE = 0.02
+# R² en dessous duquel l'ajustement n'explique pas la latence : pas de croissance annoncée
+GROWTH_MIN_R2 = 0.5
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Graphiques et rapport des benchmarks")
+    p.add_argument('sweeps', nargs='*', default=None, help="Sweeps à inclure (défaut: tous les out/<sweep>.csv)")
+    p.add_argument('--out-dir', default=OUT_DIR)
+    p.add_argument('--no-html', action='store_true')
+    return p.parse_args()
+
+def number(value):
+    # Ancien format : AVG_TIME = "213ms" ; les libellés (PARAM d'une grille, MODE) restent des chaînes
+    if value is None or value == '':
+        return None
+    try:
+        return float(str(value).removesuffix('ms'))
+    except ValueError:
+        return value
+
+def load_rows(path):
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if 'AVG_MS' not in row and 'AVG_TIME' in row:
+                row['AVG_MS'] = row['AVG_TIME']
+            rows.append({key: number(value) if key != 'HIST' else value for key, value in row.items()})
+    return rows
+
+def discover(out_dir):
+    # CSV de résultats de sweep (colonnes PARAM et latence moyenne), sweeps connus en premier
+    names = []
+    for file in sorted(os.listdir(out_dir)):
+        if not file.endswith('.csv'):
+            continue
+        with open(os.path.join(out_dir, file), newline='') as f:
+            header = next(csv.reader(f), [])
+        if 'PARAM' in header and ('AVG_MS' in header or 'AVG_TIME' in header):
+            names.append(file[:-4])
+    order = list(SWEEPS)
+    return sorted(names, key=lambda name: order.index(name) if name in order else len(order))
+
+def aggregate(rows):
+    # Une entrée par palier : moyenne et écart-type des runs pour chaque métrique
+    steps = {}
+    for row in rows:
+        if row.get('PARAM') is None or row.get('AVG_MS') is None:
+            continue
+        steps.setdefault(row['PARAM'], []).append(row)
+
+    table = []
+    for param in sorted(steps):
+        runs = steps[param]
+        entry = {'PARAM': param, 'RUNS': len(runs)}
+        timing = [key for key in runs[0] if key.startswith('SRV_')]
+        for metric in ['AVG_MS', 'P50_MS', 'P99_MS', 'RPS', 'FAIL_RATIO'] + timing:
+            values = [r[metric] for r in runs if r.get(metric) is not None]
+            entry[metric] = float(np.mean(values)) if values else None
+            entry[metric + '_STD'] = float(np.std(values, ddof=1)) if len(values) > 1 else 0.0
+        table.append(entry)
+    return table
+
+def r_squared(y, predicted):
+    total = np.sum((y - y.mean()) ** 2)
+    return 1 - np.sum((y - predicted) ** 2) / total if total else 1.0
+
+def fit_models(x, y):
+    # Modèles par ordre de simplicité : fonction de prédiction, formule et R²
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    fits = []
+
+    b, a = np.polyfit(x, y, 1)
+    fits.append({'model': 'linéaire', 'predict': lambda v, a=a, b=b: a + b * v,
+                 'formula': f"{a:.1f} {b:+.3g}·x", 'slope': float(b)})
+
+    if np.all(x > 0):
+        b, a = np.polyfit(np.log(x), y, 1)
+        fits.append({'model': 'log', 'predict': lambda v, a=a, b=b: a + b * np.log(v),
+                     'formula': f"{a:.1f} {b:+.3g}·ln(x)", 'slope': float(b)})
+    if np.all(x > 0) and np.all(y > 0):
+        b, log_a = np.polyfit(np.log(x), np.log(y), 1)
+        fits.append({'model': 'puissance', 'predict': lambda v, a=np.exp(log_a), b=b: a * v ** b,
+                     'formula': f"{np.exp(log_a):.3g}·x^{b:.2f}", 'exponent': float(b), 'slope': float(b)})
+
+    for fit in fits:
+        fit['r2'] = float(r_squared(y, fit['predict'](x)))
+    return fits
+
+def best_fit(fits):
+    best = max(f['r2'] for f in fits)
+    return next(f for f in fits if f['r2'] >= best - FIT_TOLERANCE)
+
+def growth(fit):
+    # Ordre de croissance de la latence selon le modèle retenu
+    if fit['slope'] <= 0:
+        return "O(1), plate ou décroissante"
+    if fit['r2'] < GROWTH_MIN_R2:
+        return "O(1), pas de tendance nette"
+    if fit['model'] == 'linéaire':
+        return "O(k)"
+    if fit['model'] == 'log':
+        return "O(log k)"
+    k = fit['exponent']
+    return f"O(k^{k:.2f})" + (", plus que linéaire" if k > 1.1 else "")
+
+def plot_sweep(title, xlabel, table, fits, path):
+    x = np.array([s['PARAM'] for s in table])
+    avg = np.array([s['AVG_MS'] for s in table])
+    std = np.array([s['AVG_MS_STD'] for s in table])
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(10, 6.5))
+    ax.errorbar(x, avg, yerr=std, fmt='o-', color='#4c72b0', capsize=6, linewidth=2, label="Latence moyenne (± σ)")
+
+    if all(s['P50_MS'] is not None and s['P99_MS'] is not None for s in table):
+        ax.fill_between(x, [s['P50_MS'] for s in table], [s['P99_MS'] for s in table],
+                        color='#4c72b0', alpha=0.15, label="Bande p50-p99")
+
+    if fits:
+        best = best_fit(fits)
+        grid = np.geomspace(x.min(), x.max(), 100) if x.min() > 0 else np.linspace(x.min(), x.max(), 100)
+        ax.plot(grid, best['predict'](grid), '--', color='#c44e52',
+                label=f"Ajustement {best['model']} : {best['formula']} (R² {best['r2']:.2f})")
+
+    if x.min() > 0 and x.max() / x.min() >= 50:
+        ax.set_xscale('log')
+    ax.set_xticks(x)
+    ax.set_xticklabels([f"{v:g}" for v in x])
+    ax.set_ylim(bottom=0)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Temps de réponse (ms)")
+    ax.set_title(title, fontsize=16, pad=15)
+
+    handles, labels = ax.get_legend_handles_labels()
+    if all(s['RPS'] is not None for s in table):
+        twin = ax.twinx()
+        twin.grid(False)
+        twin.plot(x, [s['RPS'] for s in table], 's:', color='#55a868', label="Débit (req/s)")
+        if any(s['FAIL_RATIO'] for s in table):
+            twin.plot(x, [100 * s['FAIL_RATIO'] for s in table], 'x:', color='#8172b2', label="Erreurs (%)")
+        twin.set_ylabel("Débit (req/s) / erreurs (%)")
+        twin.set_ylim(bottom=0)
+        more_handles, more_labels = twin.get_legend_handles_labels()
+        handles, labels = handles + more_handles, labels + more_labels
+    ax.legend(handles, labels, loc='upper left', frameon=True)
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=200)
+    plt.close(fig)
+    return path
+
+def breakdown(entry):
+    # Phases empilables d'un palier : phases serveur, temps serveur non attribué, réseau
+    phases = {key[4:-3].lower(): entry[key] for key in phase_columns(entry)
+              if not key.endswith('_STD') and entry[key] is not None}
+    network = phases.pop(NETWORK, None)
+    total = entry.get(column(TOTAL))
+    if total is not None:
+        phases['autre'] = max(total - sum(phases.values()), 0.0)
+    if network is not None:
+        phases['réseau'] = network
+    return phases
+
+def plot_breakdown(title, xlabel, table, path):
+    stacks = [breakdown(s) for s in table]
+    phases = list(dict.fromkeys(phase for stack in stacks for phase in stack))
+    labels = [f"{s['PARAM']:g}" for s in table]
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(10, 6.5))
+    bottom = np.zeros(len(table))
+    for phase in phases:
+        values = np.array([stack.get(phase, 0.0) for stack in stacks])
+        ax.bar(labels, values, bottom=bottom, label=phase)
+        bottom += values
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Temps moyen par requête /api/timeline (ms)")
+    ax.set_title(f"{title} : décomposition", fontsize=16, pad=15)
+    ax.legend(loc='upper left', frameon=True)
+    fig.tight_layout()
+    fig.savefig(path, dpi=200)
+    plt.close(fig)
+    return path
+
+def groups(name, rows):
+    # [(suffixe, lignes)] : le sweep entier, ou une courbe par combinaison pour les sweeps GROUPED
+    if name not in GROUPED:
+        return [('', rows)]
+    x, by = GROUPED[name]
+    grouped = {}
+    for row in rows:
+        if row.get(x) is None or any(row.get(column) is None for column in by):
+            continue
+        grouped.setdefault(tuple(row[column] for column in by), []).append({**row, 'PARAM': row[x]})
+    return [(", ".join(f"{column}={value:g}" if isinstance(value, float) else f"{column}={value}"
+                       for column, value in zip(by, key)), grouped[key])
+            for key in sorted(grouped, key=lambda k: [str(v) for v in k])]
+
+def analyse_sweep(name, out_dir):
+    path = os.path.join(out_dir, f"{name}.csv")
+    if not os.path.exists(path):
+        print(f"[Report] {path} introuvable, sweep '{name}' ignoré.")
+        return []
+    title, xlabel = SWEEPS.get(name, (name, 'Paramètre'))
+    sections = []
+    for suffix, rows in groups(name, load_rows(path)):
+        if any(not isinstance(row.get('PARAM'), (float, type(None))) for row in rows):
+            print(f"[Report] {path} : paliers non numériques (PARAM = libellé), sweep '{name}' ignoré "
+                  f"(à déclarer dans GROUPED).")
+            return []
+        table = aggregate(rows)
+        if not table:
+            print(f"[Report] {path} ne contient aucun run exploitable" + (f" ({suffix})." if suffix else "."))
+            continue
+        slug = name + ("_" + "_".join(part.split('=')[1] for part in suffix.split(", ")) if suffix else "")
+        section_title = f"{title} ({suffix})" if suffix else title
+        fits = fit_models([s['PARAM'] for s in table], [s['AVG_MS'] for s in table]) if len(table) >= 3 else []
+        image = plot_sweep(section_title, xlabel, table, fits, os.path.join(out_dir, f"{slug}.png"))
+        print(f"[Report] {section_title}: {len(table)} paliers -> {image}")
+        section = {'name': slug, 'title': section_title, 'xlabel': xlabel, 'table': table, 'fits': fits,
+                   'image': os.path.basename(image), 'breakdown': None}
+        if all(s.get('SRV_TIMED') for s in table):
+            image = plot_breakdown(section_title, xlabel, table, os.path.join(out_dir, f"{slug}_breakdown.png"))
+            section['breakdown'] = os.path.basename(image)
+            print(f"[Report] {section_title}: décomposition Server-Timing -> {image}")
+        sections.append(section)
+    return sections
+
+def fmt(value, digits=1):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+def markdown(sections):
+    lines = ["# Rapport de benchmark", "", f"Généré le {datetime.now():%Y-%m-%d %H:%M}.", ""]
+    for section in sections:
+        title, xlabel = section['title'], section['xlabel']
+        lines += [f"## {title}", "", f"![{section['name']}]({section['image']})", ""]
+        lines += [f"| {xlabel} | Runs | Moyenne (ms) | σ (ms) | p50 (ms) | p99 (ms) | req/s | Erreurs |",
+                  "|---:|---:|---:|---:|---:|---:|---:|---:|"]
+        for s in section['table']:
+            fail = '-' if s['FAIL_RATIO'] is None else f"{s['FAIL_RATIO']:.1%}"
+            lines.append(f"| {s['PARAM']:g} | {s['RUNS']} | {fmt(s['AVG_MS'])} | {fmt(s['AVG_MS_STD'])} | "
+                         f"{fmt(s['P50_MS'], 0)} | {fmt(s['P99_MS'], 0)} | {fmt(s['RPS'], 2)} | {fail} |")
+        lines.append("")
+        if section['fits']:
+            best = best_fit(section['fits'])
+            lines += ["| Modèle | Formule | R² |", "|---|---|---:|"]
+            for fit in section['fits']:
+                mark = " **(retenu)**" if fit is best else ""
+                lines.append(f"| {fit['model']}{mark} | `{fit['formula']}` | {fit['r2']:.3f} |")
+            lines.append("")
+            lines += [f"Croissance de la latence moyenne : {growth(best)} (ajustement {best['model']}).", ""]
+        else:
+            lines += ["Pas assez de paliers (3 minimum) pour ajuster une courbe.", ""]
+        if section['breakdown']:
+            stacks = [breakdown(s) for s in section['table']]
+            phases = list(dict.fromkeys(phase for stack in stacks for phase in stack))
+            lines += ["### Décomposition de /api/timeline (Server-Timing)", "", f"![{section['name']}]({section['breakdown']})", "",
+                      f"| {xlabel} | " + " | ".join(f"{p} (ms)" for p in phases) + " |",
+                      "|---:|" + "---:|" * len(phases)]
+            for s, stack in zip(section['table'], stacks):
+                lines.append(f"| {s['PARAM']:g} | " + " | ".join(fmt(stack.get(p)) for p in phases) + " |")
+            lines.append("")
+    return "\n".join(lines)
+
+def to_html(text):
+    # Rendu minimal du Markdown produit ci-dessus (titres, images, tableaux, paragraphes)
+    body, table = [], []
+
+    def flush_table():
+        if table:
+            rows = [r for r in table if not set(r.replace('|', '').strip()) <= set('-:')]
+            body.append("<table>")
+            for i, row in enumerate(rows):
+                tag = 'th' if i == 0 else 'td'
+                cells = [c.strip() for c in row.strip().strip('|').split('|')]
+                body.append("<tr>" + "".join(f"<{tag}>{inline(c)}</{tag}>" for c in cells) + "</tr>")
+            body.append("</table>")
+            table.clear()
+
+    def inline(value):
+        value = html.escape(value)
+        for mark, tag in (('**', 'strong'), ('`', 'code')):
+            while value.count(mark) >= 2:
+                value = value.replace(mark, f"<{tag}>", 1).replace(mark, f"</{tag}>", 1)
+        return value
+
+    for line in text.splitlines():
+        if line.startswith('|'):
+            table.append(line)
+            continue
+        flush_table()
+        if line.startswith('### '):
+            body.append(f"<h3>{inline(line[4:])}</h3>")
+        elif line.startswith('## '):
+            body.append(f"<h2>{inline(line[3:])}</h2>")
+        elif line.startswith('# '):
+            body.append(f"<h1>{inline(line[2:])}</h1>")
+        elif line.startswith('!['):
+            alt, src = line[2:].split('](')
+            body.append(f'<img src="{html.escape(src[:-1])}" alt="{html.escape(alt)}" width="800">')
+        elif line:
+            body.append(f"<p>{inline(line)}</p>")
+    flush_table()
+    style = ("body{font-family:sans-serif;max-width:900px;margin:auto}"
+             "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}")
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Rapport de benchmark</title>"
+            f"<style>{style}</style></head><body>\n" + "\n".join(body) + "\n</body></html>\n")
+
+def main():
+    args = parse_args()
+    sweeps = args.sweeps or discover(args.out_dir)
+    sections = [section for name in sweeps for section in analyse_sweep(name, args.out_dir)]
+    if not sections:
+        print("[Report] Aucun résultat à présenter.")
+        return 1
+
+    text = markdown(sections)
+    path = os.path.join(args.out_dir, 'report.md')
+    with open(path, 'w') as f:
+        f.write(text)
+    print(f"[Report] Rapport : {path}")
+    if not args.no_html:
+        path = os.path.join(args.out_dir, 'report.html')
+        with open(path, 'w') as f:
+            f.write(to_html(text))
+        print(f"[Report] Rapport : {path}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import time
+
+# Journal append-only des runs : une ligne JSON par run terminé.
+# Clé d'un run : (campagne, sweep, paramètre, run, empreinte du dataset).
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+RESULTS_LOG = os.path.join(PROJECT_ROOT, 'out', 'results.jsonl')
+DEFAULT_CAMPAIGN = os.environ.get('BENCH_CAMPAIGN', 'default')
+
+def fingerprint(spec):
+    if spec is None:
+        return None
+    canonical = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+def run_key(campaign, sweep, param, run, dataset):
+    return (campaign, sweep, json.dumps(param), int(run), dataset)
+
+class ResultsLog:
+    def __init__(self, path=RESULTS_LOG):
+        self.path = path
+        self.entries = []
+        self.keys = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    self._index(entry)
+
+    def _index(self, entry):
+        self.entries.append(entry)
+        self.keys.add(run_key(entry['campaign'], entry['sweep'], entry['param'], entry['run'], entry.get('dataset')))
+
+    def done(self, campaign, sweep, param, run, dataset):
+        return run_key(campaign, sweep, param, run, dataset) in self.keys
+
+    def entry(self, campaign, sweep, param, run, dataset, row, **extra):
+        return {
+            'campaign': campaign,
+            'sweep': sweep,
+            'param': param,
+            'run': run,
+            'dataset': dataset,
+            'time': time.time(),
+            'row': row,
+            **extra,
+        }
+
+    def append(self, campaign, sweep, param, run, dataset, row, **extra):
+        return self.append_many([self.entry(campaign, sweep, param, run, dataset, row, **extra)])[0]
+
+    def append_many(self, entries):
+        # Une seule écriture : un arrêt brutal ne peut tronquer que la dernière ligne
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        for entry in entries:
+            self._index(entry)
+        return entries
+
+    def select(self, campaign=None, sweep=None):
+        return [
+            e for e in self.entries
+            if (campaign is None or e['campaign'] == campaign) and (sweep is None or e['sweep'] == sweep)
+        ]
+
+    def campaigns(self, sweep=None):
+        seen = []
+        for entry in self.select(sweep=sweep):
+            if entry['campaign'] not in seen:
+                seen.append(entry['campaign'])
+        return seen
@@ -1,9 +1,24 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import argparse
-import random
-from datetime import datetime, timedelta
-from google.cloud import datastore
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from backend import DATASET_FILE, add_backend_args, get_client, new_entity
+from bulk import BulkWriter, RateLimiter
+from graph import DISTRIBUTIONS, follows_of, generate_follows
+from instrument import Instrumentation, add_instrument_args
+
+if TYPE_CHECKING:
+    from google.cloud import datastore
 
 def parse_args():
     p = argparse.ArgumentParser(description="Seed Datastore for Tiny Instagram")
@@ -12,121 +27,448 @@ def parse_args():
     p.add_argument('--follows-min', type=int, default=1)
     p.add_argument('--follows-max', type=int, default=3)
     p.add_argument('--prefix', type=str, default='user')
+    p.add_argument('--follows-dist', choices=DISTRIBUTIONS, default='uniform',
+                   help="Distribution de popularité des comptes suivis")
+    p.add_argument('--zipf-alpha', type=float, default=1.0)
+    p.add_argument('--celebrities', type=int, default=0, help="Comptes suivis par une large part des users")
+    p.add_argument('--celebrity-reach', type=float, default=0.5, help="Part des users qui suivent chaque célébrité")
     p.add_argument('--dry-run', action='store_true')
-    return p.parse_args()
+    p.add_argument('--batch-size', type=int, default=400)
+    p.add_argument('--workers', type=int, default=8, help="Batchs put_multi en parallèle")
+    p.add_argument('--max-in-flight', type=int, default=None, help="Batchs en attente max (défaut: 2 x workers)")
+    p.add_argument('--retries', type=int, default=5)
+    p.add_argument('--seed', type=int, default=None,
+                   help="Graine : graphe et posts identiques d'un seed à l'autre (dates fixes)")
+    p.add_argument('--rate', type=float, default=0, help="Débit cible de génération des posts (posts/s, 0 = illimité)")
+    add_backend_args(p)
+    p.add_argument('--diff', action='store_true', help="N'écrit que le delta par rapport au dataset existant")
+    p.add_argument('--materialize', type=int, default=0, metavar='N',
+                   help="Construit une timeline matérialisée (N posts les plus récents) par user (fanout-on-write)")
+    p.add_argument('--report', type=str, default=None, help="Écrit un résumé JSON du seed")
+    p.add_argument('--fingerprint', type=str, default=None, help="Empreinte du dataset demandé (harness)")
+    p.add_argument('--dataset-file', type=str, default=DATASET_FILE, help="Manifeste du dataset (lu par le locustfile)")
+    add_instrument_args(p)
+    args = p.parse_args()
+    args.instrumentation = Instrumentation(args.instrument, args.profiler, script='seed')
+    return args
+
+def make_writer(client: datastore.Client, args, label: str, op=None) -> BulkWriter:
+    return BulkWriter(
+        args.instrumentation.timed(op or client.put_multi, label),
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        max_retries=args.retries,
+        label=label,
+        dry=args.dry_run,
+    )
 
-def ensure_users(client: datastore.Client, names: list[str], dry: bool):
-    created = 0
-    batch = []
-    
+def graph_options(args) -> dict:
+    return {
+        'dist': args.follows_dist,
+        'alpha': args.zipf_alpha,
+        'celebrities': args.celebrities,
+        'celebrity_reach': args.celebrity_reach,
+    }
+
+def rngs(seed: int | None) -> tuple[np.random.Generator, np.random.Generator]:
+    # Flux indépendants pour le graphe et les posts : le graphe ne dépend pas du nombre de posts
+    if seed is None:
+        return np.random.default_rng(), np.random.default_rng()
+    return np.random.default_rng([seed, 0]), np.random.default_rng([seed, 1])
+
+def ensure_users(client: datastore.Client, names: list[str], writer: BulkWriter):
     for name in names:
         key = client.key('User', name)
-        entity = datastore.Entity(key)
+        entity = new_entity(key)
         entity['follows'] = []
-        batch.append(entity)
-        
-        if len(batch) >= 400:
-            if not dry:
-                client.put_multi(batch)
-            created += len(batch)
-            batch = []
-            print(".", end="", flush=True)
-
-    if batch:
-        if not dry:
-            client.put_multi(batch)
-        created += len(batch)
-        
-    print(f" ({created} users traités)")
-    return created
-
-def assign_follows(client: datastore.Client, names: list[str], fmin: int, fmax: int, dry: bool):
-    
-    batch = []
-    count = 0
-    
-    for name in names:
+        writer.add(entity)
+
+    writer.flush()
+    print(f" ({len(names)} users traités)")
+    return len(names)
+
+def build_graph(names: list[str], fmin: int, fmax: int, **graph_opts) -> dict[str, list[str]]:
+    offsets, targets = generate_follows(len(names), fmin, fmax, **graph_opts)
+    return {name: sorted(names[j] for j in follows_of(offsets, targets, i)) for i, name in enumerate(names)}
+
+def assign_follows(client: datastore.Client, names: list[str], fmin: int, fmax: int, writer: BulkWriter,
+                   only: list[str] | None = None, graph: dict[str, list[str]] | None = None,
+                   **graph_opts) -> dict[str, list[str]]:
+    graph = graph or build_graph(names, fmin, fmax, **graph_opts)
+
+    written = {}
+    for name in (names if only is None else only):
         key = client.key('User', name)
-        entity = datastore.Entity(key)
-        
-        others = [u for u in names if u != name]
-        if others:
-            target_count = random.randint(min(fmin, len(others)), min(fmax, len(others)))
-            selection = random.sample(others, target_count)
-            entity['follows'] = sorted(selection)
+        entity = new_entity(key)
+        entity['follows'] = graph[name]
+
+        written[name] = entity['follows']
+        writer.add(entity)
+
+    writer.flush()
+    return written
+
+def read_users(client: datastore.Client) -> dict[str, list[str]]:
+    return {e.key.name: list(e.get('follows') or []) for e in client.query(kind='User').fetch()}
+
+def count_posts(client: datastore.Client) -> int:
+    query = client.query(kind='Post')
+    try:
+        for aggregations in client.aggregation_query(query).count(alias='total').fetch():
+            for agg in aggregations:
+                return int(agg.value)
+        return 0
+    except AttributeError:
+        # Clients anciens sans requêtes d'agrégation
+        query.keys_only()
+        return sum(1 for _ in query.fetch())
+
+def load_test_posts(client: datastore.Client) -> list:
+    # Posts hors dataset (écrits pendant un run) : contenu hors de la plage des posts seedés
+    keys = []
+    for operator, bound in (('<', SEED_CONTENT), ('>=', SEED_CONTENT_END)):
+        query = client.query(kind='Post')
+        query.add_filter('content', operator, bound)
+        query.keys_only()
+        keys.extend(e.key for e in query.fetch())
+    return keys
+
+def delete_keys(client: datastore.Client, args, label: str, keys) -> int:
+    with args.instrumentation.phase('deletes') as phase:
+        with make_writer(client, args, label, client.delete_multi) as writer:
+            writer.extend(keys)
+        stats = writer.report()
+        phase['entities'] = stats['written']
+    return stats['failed']
+
+def stale_follows(current: dict[str, list[str]], names: list[str], fmin: int, fmax: int) -> list[str]:
+    valid = set(names)
+    lo, hi = min(fmin, len(names) - 1), min(fmax, len(names) - 1)
+    stale = []
+    for name in names:
+        follows = current.get(name)
+        if follows is None:
+            stale.append(name)
+            continue
+        if not lo <= len(follows) <= hi or name in follows or any(f not in valid for f in follows):
+            stale.append(name)
+    return stale
+
+def seed_diff(client: datastore.Client, args, user_names: list[str], report: dict) -> tuple[int, dict[str, list[str]]]:
+    failed = 0
+    graph_rng, post_rng = rngs(args.seed)
+
+    instrumentation = args.instrumentation
+
+    print("[Seed] Lecture du dataset existant...")
+    with instrumentation.phase('read') as phase:
+        current = read_users(client)
+        phase['entities'] = len(current)
+    extra_users = sorted(set(current) - set(user_names))
+    # Les auteurs des posts sont tirés parmi les users : si la liste change, les posts existants
+    # ne sont plus un préfixe du dataset demandé
+    users_changed = set(current) != set(user_names)
+    with instrumentation.phase('follows') as phase:
+        if args.seed is None:
+            target = None
+            stale = stale_follows(current, user_names, args.follows_min, args.follows_max)
         else:
-            entity['follows'] = []
-            
-        batch.append(entity)
-
-        if len(batch) >= 400:
-            if not dry:
-                client.put_multi(batch)
-            batch = []
-            print(".", end="", flush=True)
-            
-    if batch and not dry:
-        client.put_multi(batch)
-
-def create_posts(client: datastore.Client, names: list[str], total_posts: int, dry: bool):
-    if not names or total_posts <= 0:
+            # Graphe déterministe : tout user dont les follows diffèrent du graphe attendu est réécrit
+            target = build_graph(user_names, args.follows_min, args.follows_max, rng=graph_rng, **graph_options(args))
+            stale = [name for name in user_names if current.get(name) != target[name]]
+            phase['entities'] = sum(len(follows) for follows in target.values())
+    print(f"[Seed] {len(current)} users existants, {len(stale)} à (ré)écrire, {len(extra_users)} à supprimer.")
+
+    if stale:
+        with instrumentation.phase('users') as phase:
+            with make_writer(client, args, "Users") as writer:
+                current.update(assign_follows(client, user_names, args.follows_min, args.follows_max, writer,
+                                              only=stale, graph=target, rng=graph_rng, **graph_options(args)))
+            stats = writer.report()
+            phase['entities'] = stats['written']
+        failed += stats['failed']
+
+    if extra_users:
+        with instrumentation.phase('deletes') as phase:
+            with make_writer(client, args, "Delete Users", client.delete_multi) as writer:
+                for name in extra_users:
+                    writer.add(client.key('User', name))
+                    writer.add(client.key('Timeline', name))
+                    query = client.query(kind='Post')
+                    query.add_filter('author', '=', name)
+                    query.keys_only()
+                    writer.extend(e.key for e in query.fetch())
+            stats = writer.report()
+            phase['entities'] = stats['written']
+        failed += stats['failed']
+
+    if args.seed is not None and users_changed:
+        print("[Seed] Liste des users modifiée : posts regénérés.")
+        query = client.query(kind='Post')
+        query.keys_only()
+        failed += delete_keys(client, args, "Delete Posts", (e.key for e in query.fetch()))
+    else:
+        # Un seed complet n'a que des posts seedés : ceux de la charge sont supprimés avant le décompte
+        with instrumentation.phase('read'):
+            foreign = load_test_posts(client)
+        if foreign:
+            print(f"[Seed] {len(foreign)} posts écrits par la charge supprimés.")
+            failed += delete_keys(client, args, "Delete Posts", foreign)
+
+    with instrumentation.phase('read'):
+        existing_posts = count_posts(client)
+    delta = args.posts - existing_posts
+    print(f"[Seed] {existing_posts} posts existants, cible {args.posts} (delta {delta:+d}).")
+
+    if delta > 0:
+        with instrumentation.phase('posts') as phase:
+            with make_writer(client, args, "Posts") as writer:
+                # Suite du dataset : index, dates et auteurs reprennent après les posts existants
+                create_posts(client, user_names, args.posts, writer, rate=args.rate, rng=post_rng,
+                             base_time=posts_base_time(args), skip=existing_posts)
+            stats = writer.report()
+            phase['entities'] = stats['written']
+        failed += stats['failed']
+    elif delta < 0:
+        # Posts seedés à rebours depuis base_time : les plus anciens sont les derniers du dataset
+        query = client.query(kind='Post')
+        query.keys_only()
+        query.order = ['created']
+        failed += delete_keys(client, args, "Delete Posts", (e.key for e in query.fetch(limit=-delta)))
+
+    graph = {name: current[name] for name in user_names}
+    if args.materialize:
+        with instrumentation.phase('read'):
+            inboxes = rebuild_inboxes(client, graph, args.materialize)
+        failed += write_timelines(client, args, inboxes, report)
+    else:
+        # Timelines d'un seed --materialize précédent : périmées dès que posts ou follows changent
+        query = client.query(kind='Timeline')
+        query.keys_only()
+        with instrumentation.phase('read'):
+            timelines = [e.key for e in query.fetch()]
+        if timelines:
+            print(f"[Seed] {len(timelines)} timelines matérialisées supprimées (pas de --materialize).")
+            failed += delete_keys(client, args, "Delete Timelines", timelines)
+
+    return failed, graph
+
+class Inboxes:
+    # Timeline matérialisée : les N posts les plus récents des followees, par follower
+    def __init__(self, graph: dict[str, list[str]], size: int):
+        self.size = size
+        self.followers = defaultdict(list)
+        for user, follows in graph.items():
+            for followee in follows:
+                self.followers[followee].append(user)
+        self.boxes = {user: [] for user in graph}
+        self.fanout_writes = 0
+
+    def push(self, author: str, key, created: datetime):
+        entry = (created, key.id_or_name, key)
+        for follower in self.followers.get(author, ()):
+            self.fanout_writes += 1
+            box = self.boxes[follower]
+            if len(box) < self.size:
+                heapq.heappush(box, entry)
+            elif entry[:2] > box[0][:2]:
+                heapq.heapreplace(box, entry)
+
+    def write(self, client: datastore.Client, writer: BulkWriter):
+        for user, box in self.boxes.items():
+            entity = new_entity(client.key('Timeline', user), exclude_from_indexes=('posts',))
+            entity['posts'] = [key for _, _, key in sorted(box, key=lambda e: e[:2], reverse=True)]
+            entity['updated'] = datetime.utcnow()
+            writer.add(entity)
+        writer.flush()
+        return len(self.boxes)
+
+def rebuild_inboxes(client: datastore.Client, graph: dict[str, list[str]], size: int) -> Inboxes:
+    # En mode diff, les timelines sont reconstruites à partir des posts existants
+    inboxes = Inboxes(graph, size)
+    for post in client.query(kind='Post').fetch():
+        inboxes.push(post['author'], post.key, post['created'])
+    return inboxes
+
+def write_timelines(client: datastore.Client, args, inboxes: Inboxes, report: dict) -> int:
+    print(f"[Seed] Écriture des timelines matérialisées ({args.materialize} posts max)...")
+    with args.instrumentation.phase('timelines') as phase:
+        with make_writer(client, args, "Timelines") as writer:
+            inboxes.write(client, writer)
+        stats = writer.report()
+        phase['entities'] = stats['written']
+    report['timeline_entities'] = stats['written']
+    report['fanout_writes'] = inboxes.fanout_writes
+    return stats['failed']
+
+def write_report(path: str, report: dict):
+    posts = report.get('posts') or 0
+    if 'fanout_writes' in report:
+        report['write_amplification'] = report['fanout_writes'] / posts if posts else 0.0
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def hot_users(graph: dict[str, list[str]], count: int = 10) -> list[str]:
+    followers = Counter(followee for follows in graph.values() for followee in follows)
+    return [name for name, _ in followers.most_common(count)]
+
+def write_manifest(path: str, args, graph: dict[str, list[str]], report: dict):
+    manifest = {
+        'users': args.users,
+        'prefix': args.prefix,
+        'posts': args.posts,
+        'follows_min': args.follows_min,
+        'follows_max': args.follows_max,
+        **{f"graph_{k}": v for k, v in graph_options(args).items()},
+        'materialize': args.materialize,
+        'seed': args.seed,
+        'hot_users': hot_users(graph),
+        'fingerprint': args.fingerprint,
+        # Coût du fanout-on-write (--materialize), relu par strategy.py sans reseed
+        **{k: report[k] for k in ('timeline_entities', 'fanout_writes') if k in report},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+# Posts générés par chunks vectorisés (auteurs, dates, contenus) : mémoire bornée par
+# POST_CHUNK + les batchs en vol du writer, quel que soit le total.
+POST_CHUNK = 10000
+SEED_EPOCH = datetime(2025, 1, 1)
+# Contenu des posts seedés ; les autres posts viennent de la charge (/api/post). Borne haute de la
+# plage : "Seed post!" (' ' < '!')
+SEED_CONTENT = "Seed post "
+SEED_CONTENT_END = "Seed post!"
+
+def post_chunks(names: list[str], total_posts: int, base_time: datetime, chunk_size: int = POST_CHUNK, rng=None,
+                skip: int = 0):
+    # skip : posts déjà présents (seed --diff) ; leurs auteurs sont tirés quand même pour que les
+    # suivants soient identiques à ceux d'un seed complet (mêmes index, dates et auteurs)
+    rng = rng or np.random.default_rng()
+    pool = np.asarray(names, dtype=object)
+    base = np.datetime64(base_time, 'us')
+    for start in range(0, total_posts, chunk_size):
+        n = min(chunk_size, total_posts - start)
+        drawn = rng.integers(0, len(names), size=n)
+        if start + n <= skip:
+            continue
+        first = max(skip, start)
+        authors = pool[drawn[first - start:]].tolist()
+        # Un post par seconde en remontant le temps depuis base_time
+        created = (base - np.arange(first, start + n).astype('timedelta64[s]')).tolist()
+        contents = [f"{SEED_CONTENT}{i} by {author}" for i, author in zip(range(first + 1, start + n + 1), authors)]
+        yield authors, created, contents
+
+def posts_base_time(args) -> datetime:
+    # Avec --seed, les dates des posts ne dépendent pas de l'heure du seed
+    return SEED_EPOCH if args.seed is not None else datetime.utcnow()
+
+def create_posts(client: datastore.Client, names: list[str], total_posts: int, writer: BulkWriter,
+                 inboxes: Inboxes | None = None, rate: float = 0, rng=None, base_time: datetime | None = None,
+                 skip: int = 0):
+    # Écrit les posts skip+1..total_posts du dataset
+    if not names or total_posts <= skip:
         return 0
-    
-    created = 0
-    base_time = datetime.utcnow()
-    batch = []
-
-    print(f"Génération de {total_posts} posts en mode batch...")
-
-    for i in range(total_posts):
-        author = random.choice(names)
-        key = client.key('Post')
-        post = datastore.Entity(key)
-        
-        post['author'] = author
-        post['content'] = f"Seed post {i+1} by {author}"
-        post['created'] = base_time - timedelta(seconds=i)
-        
-        batch.append(post)
-
-        if len(batch) >= 400:
-            if not dry:
-                try:
-                    client.put_multi(batch)
-                except Exception as e:
-                    print(f"x", end="", flush=True)
-                    pass
-            created += len(batch)
-            batch = []
-            if created % 5000 == 0:
-                print(f" {created}", end="", flush=True)
+
+    limiter = RateLimiter(rate)
+    print(f"Génération de {total_posts - skip} posts par chunks de {POST_CHUNK}"
+          + (f" (à partir du post {skip + 1})" if skip else "")
+          + (f", {rate:.0f} posts/s visés..." if rate else "..."))
+
+    for authors, created, contents in post_chunks(names, total_posts, base_time or datetime.utcnow(), rng=rng,
+                                                  skip=skip):
+        for start in range(0, len(authors), writer.batch_size):
+            stop = min(start + writer.batch_size, len(authors))
+            if inboxes is None:
+                keys = [client.key('Post') for _ in range(start, stop)]
             else:
-                print(".", end="", flush=True)
+                # IDs alloués d'avance pour référencer les posts dans les timelines
+                keys = client.allocate_ids(client.key('Post'), stop - start)
+
+            for i, key in zip(range(start, stop), keys):
+                post = new_entity(key)
+                post.update(author=authors[i], content=contents[i], created=created[i])
+                writer.add(post)
+                if inboxes is not None:
+                    inboxes.push(authors[i], key, created[i])
+            limiter.wait(stop - start)
 
-    if batch:
-        if not dry:
-            client.put_multi(batch)
-        created += len(batch)
-        
-    return created
+    writer.flush()
+    return total_posts - skip
 
 def main():
     args = parse_args()
-    client = datastore.Client()
+    client = get_client(args.backend)
+    instrumentation = args.instrumentation.start()
 
     user_names = [f"{args.prefix}{i}" for i in range(1, args.users + 1)]
 
     print(f"[Seed] Configuration: {args.users} users, {args.posts} posts total.")
+    print(f"[Seed] Écriture: batchs de {args.batch_size}, {args.workers} en parallèle.")
+
+    start = time.perf_counter()
+    report = {
+        'users': args.users,
+        'posts': args.posts,
+        'follows_min': args.follows_min,
+        'follows_max': args.follows_max,
+        **{f"graph_{k}": v for k, v in graph_options(args).items()},
+        'materialize': args.materialize,
+        'seed': args.seed,
+        'diff': args.diff,
+    }
+
+    if args.diff:
+        failed, graph = seed_diff(client, args, user_names, report)
+    else:
+        failed = 0
+        graph_rng, post_rng = rngs(args.seed)
+
+        print("[Seed] Création Users + Follows...")
+        with instrumentation.phase('follows') as phase:
+            graph = build_graph(user_names, args.follows_min, args.follows_max, rng=graph_rng, **graph_options(args))
+            phase['entities'] = sum(len(follows) for follows in graph.values())
+        with instrumentation.phase('users') as phase:
+            with make_writer(client, args, "Users") as writer:
+                assign_follows(client, user_names, args.follows_min, args.follows_max, writer, graph=graph)
+            stats = writer.report()
+            phase['entities'] = stats['written']
+        failed += stats['failed']
+        print("[Seed] Users terminés.")
+
+        inboxes = Inboxes(graph, args.materialize) if args.materialize else None
+
+        print("[Seed] Création des Posts...")
+        with instrumentation.phase('posts') as phase:
+            with make_writer(client, args, "Posts") as writer:
+                create_posts(client, user_names, args.posts, writer, inboxes, rate=args.rate, rng=post_rng,
+                             base_time=posts_base_time(args))
+            stats = writer.report()
+            phase['entities'] = stats['written']
+        failed += stats['failed']
+        print(f"[Seed] {stats['written']} posts créés.")
+
+        if inboxes is not None:
+            failed += write_timelines(client, args, inboxes, report)
+
+    report['elapsed'] = time.perf_counter() - start
+    report['failed'] = failed
+    instrumentation.finish(dataset=args.fingerprint, failed=failed)
+    if args.report:
+        write_report(args.report, report)
+    if 'fanout_writes' in report:
+        print(f"[Seed] Fanout-on-write: {report['fanout_writes']} insertions de timeline "
+              f"pour {args.posts} posts ({report['fanout_writes'] / max(args.posts, 1):.1f}x).")
 
-    print("[Seed] Création Users + Follows...")
-    assign_follows(client, user_names, args.follows_min, args.follows_max, args.dry_run)
-    print("\n[Seed] Users terminés.")
+    if failed:
+        print(f"[Seed] ERREUR: {failed} entités non écrites après {args.retries} retries.")
+        sys.exit(1)
 
-    print("[Seed] Création des Posts...")
-    created_posts = create_posts(client, user_names, args.posts, args.dry_run)
-    print(f"\n[Seed] {created_posts} posts créés.")
+    if not args.dry_run:
+        write_manifest(args.dataset_file, args, graph, report)
 
-    print("[Seed] Terminé.")
+    print("[Seed] Terminé (diff)." if args.diff else "[Seed] Terminé.")
 
 if __name__ == '__main__':
     main()
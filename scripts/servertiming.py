@@ -0,0 +1,147 @@
+import time
+from contextlib import contextmanager
+
+# Décomposition du temps de réponse via l'en-tête Server-Timing (https://w3c.github.io/server-timing/) :
+# - côté serveur, ServerTiming mesure les phases d'une requête et produit l'en-tête ;
+# - côté locust, TimingCollector l'agrège par phase et déduit le reste (réseau, file d'attente,
+#   démarrage à froid de l'instance) du temps mesuré par le client.
+
+HEADER = 'Server-Timing'
+TOTAL = 'total'
+# Temps client non couvert par le serveur : RTT, file d'attente du frontal, cold start
+NETWORK = 'network'
+# Requêtes décomposées (préfixe du nom locust) : les phases de /api/post et /api/follow (put, fanout)
+# ne se mélangent pas à celles de la lecture de timeline
+TIMED_REQUESTS = '/api/timeline'
+
+class ServerTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def header(self):
+        total = (time.perf_counter() - self.start) * 1000
+        parts = [f"{name};dur={ms:.3f}" for name, ms in self.phases.items()]
+        parts.append(f"{TOTAL};dur={total:.3f}")
+        return ", ".join(parts)
+
+def parse(header):
+    # "db;dur=53.2, app;desc=\"...\";dur=47.2" -> {'db': 53.2, 'app': 47.2}
+    timings = {}
+    for metric in (header or '').split(','):
+        fields = [f.strip() for f in metric.split(';')]
+        if not fields[0]:
+            continue
+        for field in fields[1:]:
+            key, _, value = field.partition('=')
+            if key.strip().lower() == 'dur':
+                try:
+                    timings[fields[0]] = timings.get(fields[0], 0.0) + float(value)
+                except ValueError:
+                    pass
+    return timings
+
+def column(phase):
+    return f"SRV_{phase.upper()}_MS"
+
+def phase_columns(row):
+    # Colonnes des phases empilables (hors total) présentes dans une ligne de résultats
+    return [key for key in row if key.startswith('SRV_') and key.endswith('_MS') and key != column(TOTAL)]
+
+def describe(row):
+    parts = [f"{key[4:-3].lower()} {row[key]}ms" for key in phase_columns(row)]
+    return " | ".join(parts)
+
+class TimingCollector:
+    # Somme des durées par phase sur les réponses portant l'en-tête ; en distribué, chaque worker
+    # envoie ses sommes au master avec ses stats (report_to_master / worker_report).
+    def __init__(self, events, requests=TIMED_REQUESTS):
+        self.requests = requests
+        self.sums = {}
+        self.timed = 0
+        self.untimed = 0
+        events.request.add_listener(self.on_request)
+        events.report_to_master.add_listener(self.on_report_to_master)
+        events.worker_report.add_listener(self.on_worker_report)
+
+    def reset(self):
+        self.sums = {}
+        self.timed = 0
+        self.untimed = 0
+
+    def on_request(self, name=None, response_time=None, response=None, exception=None, **kwargs):
+        if not (name or '').startswith(self.requests):
+            return
+        headers = getattr(response, 'headers', None)
+        timings = parse(headers.get(HEADER)) if headers is not None and exception is None else {}
+        if not timings:
+            self.untimed += 1
+            return
+        self.timed += 1
+        for name, ms in timings.items():
+            self.sums[name] = self.sums.get(name, 0.0) + ms
+        if response_time is not None and TOTAL in timings:
+            self.sums[NETWORK] = self.sums.get(NETWORK, 0.0) + max(response_time - timings[TOTAL], 0.0)
+
+    def on_report_to_master(self, client_id, data):
+        data['server_timing'] = {'sums': self.sums, 'timed': self.timed, 'untimed': self.untimed}
+        self.reset()
+
+    def on_worker_report(self, client_id, data):
+        report = data.get('server_timing')
+        if not report:
+            return
+        for name, ms in report['sums'].items():
+            self.sums[name] = self.sums.get(name, 0.0) + ms
+        self.timed += report['timed']
+        self.untimed += report['untimed']
+
+    def snapshot(self):
+        # Compteurs cumulés : la différence entre deux snapshots couvre une fenêtre du run
+        return {'sums': dict(self.sums), 'timed': self.timed, 'untimed': self.untimed}
+
+    def breakdown(self):
+        return breakdown(self.snapshot())
+
+    def row(self):
+        return row(self.snapshot())
+
+def delta(current, previous):
+    return {
+        'sums': {name: ms - previous['sums'].get(name, 0.0) for name, ms in current['sums'].items()},
+        'timed': current['timed'] - previous['timed'],
+        'untimed': current['untimed'] - previous['untimed'],
+    }
+
+def merge(snapshots):
+    merged = {'sums': {}, 'timed': 0, 'untimed': 0}
+    for snapshot in snapshots:
+        for name, ms in snapshot['sums'].items():
+            merged['sums'][name] = merged['sums'].get(name, 0.0) + ms
+        merged['timed'] += snapshot['timed']
+        merged['untimed'] += snapshot['untimed']
+    return merged
+
+def breakdown(snapshot):
+    # Moyenne par requête instrumentée de chaque phase (ms)
+    if not snapshot['timed']:
+        return {}
+    return {name: ms / snapshot['timed'] for name, ms in snapshot['sums'].items()}
+
+def row(snapshot):
+    result = {column(name): round(ms, 2) for name, ms in breakdown(snapshot).items()}
+    total = snapshot['timed'] + snapshot['untimed']
+    result['SRV_TIMED'] = round(snapshot['timed'] / total, 4) if total else 0.0
+    return result
+
+def window_row(snapshots):
+    # Ligne de résultats sur une suite de deltas (ticks du régime stable, runs d'un palier)
+    return row(merge(snapshots))
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend import DATASET_FILE, add_backend_args, get_client, new_entity
+from bulk import BulkWriter
+from clean import clean_datastore
+
+# Snapshot binaire d'un dataset (Users + follows, Posts, Timelines) dans un .npz compressé :
+# tableaux numpy uniquement (pas de pickle), chaînes regroupées en un blob UTF-8 + offsets.
+# Rechargé par chunks et écrit via BulkWriter, avec les mêmes clés que le dataset exporté.
+
+FORMAT_VERSION = 1
+EPOCH = datetime(1970, 1, 1)
+CHUNK = 10000
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Export / import d'un snapshot du dataset")
+    p.add_argument('action', choices=['export', 'import'])
+    p.add_argument('path', help="Fichier .npz")
+    p.add_argument('--clean', action='store_true', help="(import) Vide la base avant de charger le snapshot")
+    p.add_argument('--batch-size', type=int, default=400)
+    p.add_argument('--workers', type=int, default=16)
+    p.add_argument('--dataset-file', default=DATASET_FILE, help="Manifeste embarqué (export) / restauré (import)")
+    add_backend_args(p)
+    return p.parse_args()
+
+def to_us(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def from_us(values):
+    return values.astype('datetime64[us]').tolist()
+
+def pack_strings(strings):
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def unpack_strings(blob, offsets, start=0, stop=None):
+    stop = len(offsets) - 1 if stop is None else stop
+    raw = blob[offsets[start]:offsets[stop]].tobytes()
+    base = offsets[start]
+    return [raw[offsets[i] - base:offsets[i + 1] - base].decode() for i in range(start, stop)]
+
+def csr(rows):
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=offsets[1:])
+    flat = [v for r in rows for v in r]
+    return offsets, flat
+
+def read_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def export_snapshot(client, path, manifest=None):
+    start = time.perf_counter()
+
+    users = sorted((e.key.name, list(e.get('follows') or [])) for e in client.query(kind='User').fetch())
+    names = [name for name, _ in users]
+    index = {name: i for i, name in enumerate(names)}
+    follow_offsets, follows = csr([[index[f] for f in fl if f in index] for _, fl in users])
+    print(f"[Snapshot] {len(names)} users, {len(follows)} follows lus.")
+
+    post_ids, authors, created, contents = [], [], [], []
+    for post in client.query(kind='Post').fetch():
+        if post.key.id is None or post.get('author') not in index:
+            continue
+        post_ids.append(post.key.id)
+        authors.append(index[post['author']])
+        created.append(to_us(post['created']))
+        contents.append(post.get('content') or '')
+    print(f"[Snapshot] {len(post_ids)} posts lus.")
+
+    owners, timelines, updated = [], [], []
+    for timeline in client.query(kind='Timeline').fetch():
+        if timeline.key.name not in index:
+            continue
+        owners.append(index[timeline.key.name])
+        timelines.append([k.id for k in timeline.get('posts') or [] if k.id is not None])
+        updated.append(to_us(timeline['updated']) if timeline.get('updated') else -1)
+    timeline_offsets, timeline_posts = csr(timelines)
+    print(f"[Snapshot] {len(owners)} timelines lues.")
+
+    user_blob, user_offsets = pack_strings(names)
+    content_blob, content_offsets = pack_strings(contents)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(
+        path,
+        version=np.array(FORMAT_VERSION),
+        manifest=np.array(json.dumps(manifest or {})),
+        user_blob=user_blob, user_offsets=user_offsets,
+        follow_offsets=follow_offsets, follow_targets=np.array(follows, dtype=np.int32),
+        post_ids=np.array(post_ids, dtype=np.int64), post_authors=np.array(authors, dtype=np.int32),
+        post_created=np.array(created, dtype=np.int64),
+        content_blob=content_blob, content_offsets=content_offsets,
+        timeline_owners=np.array(owners, dtype=np.int32), timeline_offsets=timeline_offsets,
+        timeline_posts=np.array(timeline_posts, dtype=np.int64), timeline_updated=np.array(updated, dtype=np.int64),
+    )
+    size = os.path.getsize(path) / 1e6
+    print(f"[Snapshot] Exporté dans {path} ({size:.1f} Mo, {time.perf_counter() - start:.1f}s).")
+
+def reserving(client):
+    # Les posts gardent leur ID : on les réserve pour que allocate_ids ne les redonne pas
+    def op(entities):
+        client.reserve_ids_multi([e.key for e in entities if e.key.kind == 'Post'])
+        client.put_multi(entities)
+    return op
+
+def import_snapshot(client, path, batch_size=400, workers=16):
+    start = time.perf_counter()
+    data = np.load(path)
+    if int(data['version']) != FORMAT_VERSION:
+        raise ValueError(f"Version de snapshot non supportée: {int(data['version'])}")
+
+    user_blob, user_offsets = data['user_blob'], data['user_offsets']
+    names = unpack_strings(user_blob, user_offsets)
+    follow_offsets, follow_targets = data['follow_offsets'], data['follow_targets']
+    failed = 0
+
+    with BulkWriter(client.put_multi, batch_size=batch_size, workers=workers, label="Users") as writer:
+        for i, name in enumerate(names):
+            entity = new_entity(client.key('User', name))
+            entity['follows'] = [names[j] for j in follow_targets[follow_offsets[i]:follow_offsets[i + 1]]]
+            writer.add(entity)
+    failed += writer.report()['failed']
+
+    post_ids, post_authors, post_created = data['post_ids'], data['post_authors'], data['post_created']
+    content_blob, content_offsets = data['content_blob'], data['content_offsets']
+    with BulkWriter(reserving(client), batch_size=batch_size, workers=workers, label="Posts") as writer:
+        for lo in range(0, len(post_ids), CHUNK):
+            hi = min(lo + CHUNK, len(post_ids))
+            contents = unpack_strings(content_blob, content_offsets, lo, hi)
+            created = from_us(post_created[lo:hi])
+            for i, post_id in enumerate(post_ids[lo:hi].tolist()):
+                post = new_entity(client.key('Post', post_id))
+                post.update(author=names[post_authors[lo + i]], content=contents[i], created=created[i])
+                writer.add(post)
+    failed += writer.report()['failed']
+
+    owners, offsets = data['timeline_owners'], data['timeline_offsets']
+    timeline_posts, updated = data['timeline_posts'], data['timeline_updated']
+    if len(owners):
+        with BulkWriter(client.put_multi, batch_size=batch_size, workers=workers, label="Timelines") as writer:
+            for i, owner in enumerate(owners.tolist()):
+                entity = new_entity(client.key('Timeline', names[owner]), exclude_from_indexes=('posts',))
+                entity['posts'] = [client.key('Post', p) for p in timeline_posts[offsets[i]:offsets[i + 1]].tolist()]
+                if updated[i] >= 0:
+                    entity['updated'] = from_us(updated[i:i + 1])[0]
+                writer.add(entity)
+        failed += writer.report()['failed']
+
+    print(f"[Snapshot] {len(names)} users, {len(post_ids)} posts, {len(owners)} timelines chargés "
+          f"en {time.perf_counter() - start:.1f}s.")
+    return failed, json.loads(str(data['manifest']))
+
+def main():
+    args = parse_args()
+    if args.action == 'export':
+        client = get_client(args.backend)
+        export_snapshot(client, args.path, read_manifest(args.dataset_file))
+        return
+
+    if not os.path.exists(args.path):
+        print(f"[Snapshot] {args.path} introuvable.")
+        sys.exit(1)
+    if args.clean and not clean_datastore(backend=args.backend):
+        sys.exit(1)
+    client = get_client(args.backend)
+    failed, manifest = import_snapshot(client, args.path, args.batch_size, args.workers)
+    if failed:
+        print(f"[Snapshot] ERREUR: {failed} entités non écrites.")
+        sys.exit(1)
+    if manifest:
+        os.makedirs(os.path.dirname(os.path.abspath(args.dataset_file)), exist_ok=True)
+        with open(args.dataset_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+
+from harness import Sweep, add_sweep_args, dataset_spec, read_manifest
+from fanout import FOLLOW_STEPS
+from post import POST_STEPS
+
+# Fanout-on-read vs fanout-on-write (timelines matérialisées) sur la même grille follows x posts.
+# Le serveur cible doit accepter /api/timeline?mode=materialized (cf. local_server.py).
+
+# PARAMS
+MODES = ['read', 'materialized']
+LOCUST_USERS = 50
+DB_TOTAL_USERS = 1000
+INBOX_SIZE = 50
+RUNS_PER_STEP = 3
+
+def strategy_points(post_steps=POST_STEPS, follow_steps=FOLLOW_STEPS, modes=MODES):
+    # Les deux modes à la suite sur le même dataset (un seul seed, timelines matérialisées incluses)
+    return [{'posts': posts, 'follows': follows, 'mode': mode}
+            for posts in post_steps for follows in follow_steps for mode in modes]
+
+def label(point):
+    return f"p{point['posts']}-f{point['follows']}-{point['mode']}"
+
+def columns(point):
+    # Écritures par post créé : le post seul en fanout-on-read, + une insertion par follower sinon
+    manifest = read_manifest() or {}
+    materialized = point['mode'] == 'materialized'
+    fanout_writes = manifest.get('fanout_writes', 0) if materialized else 0
+    posts = manifest.get('posts') or 0
+    return {
+        'FOLLOWS': point['follows'],
+        'POSTS_PER_USER': point['posts'],
+        'MODE': point['mode'],
+        'WRITE_AMP': round(1.0 + fanout_writes / posts, 2) if posts else 1.0,
+        'FANOUT_WRITES': fanout_writes,
+        'TIMELINE_ENTITIES': manifest.get('timeline_entities', 0) if materialized else 0,
+    }
+
+SWEEP = Sweep(
+    name='strategy',
+    param='Stratégie de timeline (posts × followees × mode)',
+    values=strategy_points(),
+    users=LOCUST_USERS,
+    dataset=lambda point: dataset_spec(DB_TOTAL_USERS, DB_TOTAL_USERS * point['posts'], point['follows'],
+                                       extra_args=["--materialize", str(INBOX_SIZE)]),
+    runs=RUNS_PER_STEP,
+    label=label,
+    columns=columns,
+    # Mode de lecture porté par la classe de users (transmis aux workers en distribué)
+    user_attributes=lambda point: {'timeline_mode': point['mode']},
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fanout-on-read vs fanout-on-write")
+    add_sweep_args(parser)
+    SWEEP.run(parser.parse_args().campaign)
@@ -0,0 +1,156 @@
+import csv
+import os
+import statistics
+import time
+
+import gevent
+
+from histogram import Histogram
+from servertiming import delta
+
+# Séries temporelles par seconde (requêtes, erreurs, histogramme) pendant un run locust,
+# coupure du warm-up et détection du régime stable.
+
+WARMUP_S = 5
+STEADY_WINDOW_S = 5
+# Ticks minimum dans la fenêtre de stabilité ; en dessous, le régime stable n'est pas vérifié
+STEADY_MIN_TICKS = 3
+STEADY_MAX_CV = 0.2
+
+class StatsSampler:
+    # Différence des compteurs cumulés de locust à chaque tick -> histogramme exact par seconde.
+    # En distribué, les workers remontent leurs stats toutes les ~3s : le sampler doit tourner au même
+    # intervalle (WORKER_REPORT_INTERVAL), sinon les ticks alternent 0 / 0 / N requêtes.
+    # timing : TimingCollector optionnel, ses sommes Server-Timing sont découpées aux mêmes ticks
+    def __init__(self, stats, interval=1.0, timing=None):
+        self.stats = stats
+        self.interval = interval
+        self.timing = timing
+        self.points = []
+        self.greenlet = None
+        self._start = None
+        self._last = None
+        self._prev = None
+
+    def _snapshot(self):
+        total = self.stats.total
+        timing = self.timing.snapshot() if self.timing is not None else None
+        return total.num_requests, total.num_failures, dict(total.response_times), timing
+
+    def _tick(self):
+        now = time.perf_counter()
+        requests, failures, buckets, timing = self._snapshot()
+        prev_requests, prev_failures, prev_buckets, prev_timing = self._prev
+        counts = {k: v - prev_buckets.get(k, 0) for k, v in buckets.items() if v != prev_buckets.get(k, 0)}
+        point = {
+            't': round(now - self._start, 3),
+            'duration': now - self._last,
+            'requests': requests - prev_requests,
+            'failures': failures - prev_failures,
+            'histogram': Histogram(counts),
+        }
+        if timing is not None:
+            point['timing'] = delta(timing, prev_timing)
+        self.points.append(point)
+        self._prev = (requests, failures, buckets, timing)
+        self._last = now
+
+    def _loop(self):
+        while True:
+            gevent.sleep(self.interval)
+            self._tick()
+
+    def start(self):
+        self._start = self._last = time.perf_counter()
+        self._prev = self._snapshot()
+        self.greenlet = gevent.spawn(self._loop)
+        return self
+
+    def stop(self):
+        self.greenlet.kill(block=True)
+        self._tick()
+        return [p for p in self.points if p['duration'] > 0]
+
+def rate(point):
+    return point['requests'] / point['duration']
+
+def steady_state(points, warmup=WARMUP_S, window=STEADY_WINDOW_S, max_cv=STEADY_MAX_CV):
+    # Premier indice après le warm-up à partir duquel le débit varie peu (CV sur une fenêtre glissante
+    # de `window` secondes). Renvoie (indice, None) quand il y a trop peu de ticks pour conclure.
+    after = [i for i, p in enumerate(points) if p['t'] - p['duration'] >= warmup]
+    if not after:
+        return 0, None
+    first = after[0]
+    tick = statistics.median(p['duration'] for p in points[first:])
+    ticks = max(STEADY_MIN_TICKS, round(window / tick)) if tick > 0 else STEADY_MIN_TICKS
+    if len(points) - first < ticks:
+        return first, None
+    for i in range(first, len(points) - ticks + 1):
+        rates = [rate(p) for p in points[i:i + ticks]]
+        mean = statistics.fmean(rates)
+        if mean > 0 and statistics.pstdev(rates) / mean <= max_cv:
+            return i, True
+    return first, False
+
+def summarize(points):
+    histogram = Histogram()
+    for point in points:
+        histogram.merge(point['histogram'])
+    requests = sum(p['requests'] for p in points)
+    failures = sum(p['failures'] for p in points)
+    duration = sum(p['duration'] for p in points)
+    return {
+        'avg_time': histogram.mean(),
+        'requests': requests,
+        'failures': failures,
+        'rps': requests / duration if duration else 0.0,
+        'fail_ratio': failures / requests if requests else 0.0,
+        'histogram': histogram,
+    }
+
+def point_rows(points, steady_from, **labels):
+    rows = []
+    for i, point in enumerate(points):
+        histogram = point['histogram']
+        rows.append({
+            **labels,
+            't': point['t'],
+            'rps': round(rate(point), 3),
+            'requests': point['requests'],
+            'failures': point['failures'],
+            'p50_ms': histogram.percentile(0.5),
+            'p90_ms': histogram.percentile(0.9),
+            'p99_ms': histogram.percentile(0.99),
+            'max_ms': histogram.max(),
+            'steady': i >= steady_from,
+        })
+    return rows
+
+def save_rows(rows, path):
+    # Parquet (colonnes compressées) si pandas/pyarrow sont installés, sinon CSV
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+        return path
+    except ImportError:
+        path = os.path.splitext(path)[0] + '.csv'
+        with open(path, 'w', newline='') as f:
+            if rows:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
+
+def load_rows(path):
+    # Sans pandas/pyarrow, save_rows a écrit le .csv voisin du .parquet demandé
+    fallback = os.path.splitext(path)[0] + '.csv'
+    if not os.path.exists(path) and os.path.exists(fallback):
+        path = fallback
+    if not os.path.exists(path):
+        return []
+    if path.endswith('.parquet'):
+        import pandas as pd
+        return pd.read_parquet(path).to_dict('records')
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
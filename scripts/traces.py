@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import gevent
+import numpy as np
+from gevent.pool import Pool
+from geventhttpclient import HTTPClient
+
+from harness import TARGET_HOST, invalidate_dataset, load_user_classes, read_manifest, result_row, run_locust
+from histogram import Histogram
+from results import ResultsLog
+from snapshot import pack_strings, unpack_strings
+
+# Enregistrement et rejeu de traces de requêtes.
+# - record : un run locust (profil du locustfile) dont chaque requête est capturée
+#   (instant, méthode, chemin, corps) dans un .npz compact ;
+# - replay : rejeu en boucle ouverte au rythme d'origine (ou x --scale) par un pool de greenlets.
+#   La latence est mesurée depuis l'instant prévu d'envoi : une requête retardée par un serveur
+#   lent compte son attente (pas de coordinated omission, contrairement aux users en boucle fermée).
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'out')
+TRACE_DIR = os.path.join(OUT_DIR, 'traces')
+
+METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD']
+FORMAT_VERSION = 1
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Enregistrement / rejeu en boucle ouverte de traces de requêtes")
+    sub = p.add_subparsers(dest='action', required=True)
+
+    rec = sub.add_parser('record', help="Capture la trace d'un run locust")
+    rec.add_argument('path', nargs='?', default=None, help="Fichier .npz (défaut: out/traces/<profil>.npz)")
+    rec.add_argument('--users', type=int, default=50)
+    rec.add_argument('--run-time', type=int, default=60)
+    rec.add_argument('--profile', default=None, help="LOCUST_PROFILE du run enregistré")
+    rec.add_argument('--host', default=None)
+
+    rep = sub.add_parser('replay', help="Rejoue une trace en boucle ouverte")
+    rep.add_argument('path')
+    rep.add_argument('--host', default=None)
+    rep.add_argument('--scale', type=float, default=1.0, help="Facteur de débit (2 = deux fois plus vite)")
+    rep.add_argument('--workers', type=int, default=512, help="Requêtes simultanées max (greenlets)")
+    rep.add_argument('--timeout', type=float, default=30.0)
+    rep.add_argument('--campaign', default=None, help="Journalise le résultat dans out/results.jsonl")
+    return p.parse_args()
+
+class TraceRecorder:
+    # Listener locust : une entrée par requête émise (in-process uniquement)
+    def __init__(self):
+        self.times = []
+        self.methods = []
+        self.paths = []
+        self.bodies = []
+
+    def attach(self, events):
+        events.request.add_listener(self.on_request)
+
+    def on_request(self, request_type=None, start_time=None, url=None, response=None, **kwargs):
+        if start_time is None or not url:
+            return
+        parts = urlsplit(url)
+        body = getattr(getattr(response, 'request', None), 'body', None) or b''
+        self.times.append(start_time)
+        self.methods.append(METHODS.index(request_type) if request_type in METHODS else 0)
+        self.paths.append(parts.path + (f"?{parts.query}" if parts.query else ""))
+        self.bodies.append(body.decode() if isinstance(body, bytes) else str(body))
+
+def save_trace(path, recorder, meta):
+    order = np.argsort(recorder.times, kind='stable')
+    times = np.asarray(recorder.times, dtype=float)[order]
+    paths = [recorder.paths[i] for i in order]
+    bodies = [recorder.bodies[i] for i in order]
+    path_blob, path_offsets = pack_strings(paths)
+    body_blob, body_offsets = pack_strings(bodies)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(
+        path,
+        version=np.array(FORMAT_VERSION),
+        meta=np.array(json.dumps(meta)),
+        t=times - times[0] if times.size else times,
+        methods=np.asarray(recorder.methods, dtype=np.uint8)[order],
+        path_blob=path_blob, path_offsets=path_offsets,
+        body_blob=body_blob, body_offsets=body_offsets,
+    )
+    return path
+
+def load_trace(path):
+    data = np.load(path)
+    if int(data['version']) != FORMAT_VERSION:
+        raise ValueError(f"Version de trace non supportée: {int(data['version'])}")
+    return {
+        'meta': json.loads(str(data['meta'])),
+        't': data['t'],
+        'methods': [METHODS[m] for m in data['methods'].tolist()],
+        'paths': unpack_strings(data['path_blob'], data['path_offsets']),
+        'bodies': unpack_strings(data['body_blob'], data['body_offsets']),
+    }
+
+def record(args):
+    if args.profile:
+        os.environ['LOCUST_PROFILE'] = args.profile
+    host = args.host or TARGET_HOST
+    profile = os.environ.get('LOCUST_PROFILE', 'uniform-read')
+    path = args.path or os.path.join(TRACE_DIR, f"{profile}.npz")
+    recorder = TraceRecorder()
+
+    print(f"--- [TRACE] Enregistrement : {args.users} users, {args.run_time}s, profil {profile} -> {host} ---")
+    user_classes = load_user_classes()
+    manifest = read_manifest() or {}
+    run_locust(args.users, args.run_time, host=host, user_classes=user_classes, listeners=[recorder.attach])
+    if any(getattr(c, 'writes', False) for c in user_classes) or any(METHODS[m] != 'GET' for m in recorder.methods):
+        # Posts / follows écrits pendant l'enregistrement : le prochain ensure_dataset refait un diff
+        invalidate_dataset()
+    meta = {
+        'profile': profile,
+        'users': args.users,
+        'run_time': args.run_time,
+        'host': host,
+        'recorded': time.time(),
+        'dataset': manifest.get('fingerprint'),
+    }
+    save_trace(path, recorder, meta)
+    rate = len(recorder.times) / args.run_time if args.run_time else 0
+    print(f"[TRACE] {len(recorder.times)} requêtes ({rate:.1f} req/s) enregistrées dans {path}")
+
+def replay(args):
+    trace = load_trace(args.path)
+    host = args.host or TARGET_HOST
+    total = len(trace['paths'])
+    duration = float(trace['t'][-1]) / args.scale if total else 0.0
+    print(f"--- [REPLAY] {total} requêtes sur {duration:.1f}s (x{args.scale}) -> {host}, "
+          f"{args.workers} en vol max ---")
+
+    client = HTTPClient.from_url(host, concurrency=args.workers, connection_timeout=args.timeout,
+                                 network_timeout=args.timeout)
+    latency, service = Histogram(), Histogram()
+    stats = {'failures': 0, 'max_lag': 0.0}
+    headers = {'Content-Type': 'application/json'}
+
+    def send(i, intended):
+        sent = time.perf_counter()
+        stats['max_lag'] = max(stats['max_lag'], sent - intended)
+        try:
+            response = client.request(trace['methods'][i], trace['paths'][i],
+                                      body=trace['bodies'][i].encode(), headers=headers)
+            response.read()
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        done = time.perf_counter()
+        # Latence vue par l'utilisateur : depuis l'instant où la requête aurait dû partir
+        latency.record((done - intended) * 1000)
+        service.record((done - sent) * 1000)
+        if not ok:
+            stats['failures'] += 1
+
+    pool = Pool(args.workers)
+    start = time.perf_counter()
+    for i, t in enumerate(trace['t'].tolist()):
+        intended = start + t / args.scale
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            gevent.sleep(delay)
+        pool.spawn(send, i, intended)
+    pool.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+    if any(method != 'GET' for method in trace['methods']):
+        # Requêtes d'écriture rejouées : le dataset ne correspond plus au manifeste
+        invalidate_dataset()
+
+    result = {
+        'avg_time': latency.mean(),
+        'requests': total,
+        'failures': stats['failures'],
+        'rps': total / elapsed if elapsed else 0.0,
+        'fail_ratio': stats['failures'] / total if total else 0.0,
+        'histogram': latency,
+        'cpu_mean': 0.0, 'cpu_max': 0.0, 'cpu_saturated': False,
+        'steady': True, 'steady_from': 0.0,
+    }
+    name = os.path.splitext(os.path.basename(args.path))[0]
+    campaign = args.campaign or 'replay'
+    hist_dir = os.path.join(OUT_DIR, 'hist', campaign, f"replay-{name}")
+    os.makedirs(hist_dir, exist_ok=True)
+
+    log = ResultsLog()
+    sweep = f"replay-{name}"
+    run = len([e for e in log.select(campaign, sweep) if e['param'] == args.scale]) + 1
+    hist_path = os.path.join(hist_dir, f"{args.scale:g}_{run}.json")
+    latency.save(hist_path, trace=name, scale=args.scale, run=run)
+
+    row = result_row(args.scale, run, result, hist_path)
+    row.update({f"SERVICE_{key}": value for key, value in service.summary().items()})
+    row['LAG_MAX_MS'] = round(stats['max_lag'] * 1000, 1)
+    print(f"[REPLAY] avg {row['AVG_MS']}ms | p99 {row['P99_MS']}ms (service p99 {row['SERVICE_P99_MS']}ms) | "
+          f"{row['RPS']} req/s | échecs {stats['failures']} | retard max d'envoi {row['LAG_MAX_MS']}ms")
+    if args.campaign:
+        log.append(campaign, sweep, args.scale, run, trace['meta'].get('dataset'), row, trace=args.path)
+        print(f"[REPLAY] Journalisé : campagne '{campaign}', sweep '{sweep}' (cf. analyze.py).")
+    return row
+
+def main():
+    args = parse_args()
+    if args.action == 'record':
+        record(args)
+    else:
+        replay(args)
+
+if __name__ == "__main__":
+    main()